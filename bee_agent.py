@@ -1,7 +1,10 @@
 # main.py
 import os
+import sys
 from crewai import Agent, Task, Crew, Process
 
+from crew_scheduler import crew_graph, print_report
+
 # You'll need to set your OPENAI_API_KEY environment variable for this to run
 os.environ["OPENAI_API_KEY"] =''
 # --- The "Grand Challenge" ---
@@ -69,15 +72,24 @@ ai_orchestrator = Agent(
 
 
 # --- Step 4: Define the Collaborative Tasks ---
-# This is the "script" for their conversation.
-list_of_tasks = [
-    Task(description=f"Using your Cell2Sentence knowledge, analyze the core problem of {CANCER_PROBLEM} and propose a single, high-impact gene target that is known to drive glioblastoma aggression.", agent=genetic_translator, expected_output="A single gene symbol (e.g., 'EGFR') and a brief justification."),
-    Task(description="Take the identified gene target. Using your AlphaFold3 knowledge, describe the protein it produces and explain why modeling its 3D structure is the critical next step for designing a targeted therapy.", agent=structural_biologist, expected_output="A description of the target protein and the strategic value of its structural model."),
-    Task(description="Based on the target protein, design a 'Hamiltonian Learning' loop. Describe the 'proposer agent' and the 'scoring function' (using AlphaFold3) to discover a novel small molecule inhibitor for this protein.", agent=discovery_engine_designer, expected_output="A 2-paragraph description of the discovery engine concept."),
-    Task(description="Now consider the discovered molecule. Propose a concept for a 'smart delivery' system, like a nanoparticle, whose payload release could be controlled in real-time, drawing inspiration from the Tokamak control system's use of RL for managing complex environments.", agent=control_systems_engineer, expected_output="A conceptual model for a controllable drug delivery system."),
-    Task(description="Review the entire proposed plan, from gene target to delivery system. Ask the three most difficult, naive-sounding questions a patient or investor would ask. Focus on the biggest, most obvious real-world hurdles.", agent=pragmatist, expected_output="A bulleted list of three critical, pragmatic questions."),
-    Task(description="You have the complete proposal and the pragmatist's critique. Synthesize everything into a final strategic brief. The brief must contain: 1. A summary of the proposed therapeutic. 2. The core scientific strategy. 3. The primary risks/questions. 4. A recommendation for the immediate next step.", agent=ai_orchestrator, expected_output="A structured, final strategic brief.")
-]
+# This is the "script" for their conversation. Each task's context lists the tasks whose
+# output it needs: the structural and delivery experts both work from the gene target, so
+# they can run at the same time. With --sequential no context is declared, so crewai hands
+# every task all earlier outputs, exactly as the original kickoff did.
+SEQUENTIAL = "--sequential" in sys.argv
+
+def depends_on(*tasks):
+    return {} if SEQUENTIAL else {"context": list(tasks)}
+
+DELIVERY_SUBJECT = "the discovered molecule" if SEQUENTIAL else "a small-molecule inhibitor of the identified gene target"
+gene_target_task = Task(description=f"Using your Cell2Sentence knowledge, analyze the core problem of {CANCER_PROBLEM} and propose a single, high-impact gene target that is known to drive glioblastoma aggression.", agent=genetic_translator, expected_output="A single gene symbol (e.g., 'EGFR') and a brief justification.")
+protein_structure_task = Task(description="Take the identified gene target. Using your AlphaFold3 knowledge, describe the protein it produces and explain why modeling its 3D structure is the critical next step for designing a targeted therapy.", agent=structural_biologist, expected_output="A description of the target protein and the strategic value of its structural model.", **depends_on(gene_target_task))
+discovery_loop_task = Task(description="Based on the target protein, design a 'Hamiltonian Learning' loop. Describe the 'proposer agent' and the 'scoring function' (using AlphaFold3) to discover a novel small molecule inhibitor for this protein.", agent=discovery_engine_designer, expected_output="A 2-paragraph description of the discovery engine concept.", **depends_on(gene_target_task, protein_structure_task))
+delivery_system_task = Task(description=f"Now consider {DELIVERY_SUBJECT}. Propose a concept for a 'smart delivery' system, like a nanoparticle, whose payload release could be controlled in real-time, drawing inspiration from the Tokamak control system's use of RL for managing complex environments.", agent=control_systems_engineer, expected_output="A conceptual model for a controllable drug delivery system.", **depends_on(gene_target_task))
+critique_task = Task(description="Review the entire proposed plan, from gene target to delivery system. Ask the three most difficult, naive-sounding questions a patient or investor would ask. Focus on the biggest, most obvious real-world hurdles.", agent=pragmatist, expected_output="A bulleted list of three critical, pragmatic questions.", **depends_on(gene_target_task, protein_structure_task, discovery_loop_task, delivery_system_task))
+brief_task = Task(description="You have the complete proposal and the pragmatist's critique. Synthesize everything into a final strategic brief. The brief must contain: 1. A summary of the proposed therapeutic. 2. The core scientific strategy. 3. The primary risks/questions. 4. A recommendation for the immediate next step.", agent=ai_orchestrator, expected_output="A structured, final strategic brief.", **depends_on(gene_target_task, protein_structure_task, discovery_loop_task, delivery_system_task, critique_task))
+list_of_tasks = [gene_target_task, protein_structure_task, discovery_loop_task,
+                 delivery_system_task, critique_task, brief_task]
 
 # --- Step 5: Assemble the Crew and Kick Off the Mission ---
 glioblastoma_crew = Crew(
@@ -87,7 +99,14 @@ glioblastoma_crew = Crew(
   verbose=True
 )
 
-result = glioblastoma_crew.kickoff()
+if SEQUENTIAL:
+    result = glioblastoma_crew.kickoff()
+else:
+    # Run the same tasks as a dependency graph: ready tasks run concurrently, and each
+    # gets only the outputs in its context.
+    task_graph = crew_graph(list_of_tasks)
+    result = task_graph.run(concurrency=3)[list(task_graph.tasks)[-1]]
+    print_report(task_graph.report())
 
 print("\n\n########################")
 print("## Final Strategic Brief:")
@@ -0,0 +1,140 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+class TaskGraph:
+    """
+    Runs tasks as soon as their dependencies are done, at most `concurrency` at a time.
+
+    Each task is a function of one argument: a dict of its dependencies' outputs,
+    in the order the dependencies were declared. Dependencies must be added first,
+    so the graph can't have cycles. When more tasks are ready than there are slots,
+    the ones heading the longest chain of dependants start first.
+    """
+
+    def __init__(self):
+        self.tasks = {}     # name -> (function, dependency names)
+        self.timings = {}   # name -> (start, end), relative to the start of run()
+        self.wall = None
+
+    def add(self, name: str, function, depends_on: list[str] = ()):
+        if name in self.tasks:
+            raise ValueError(f"duplicate task {name!r}")
+        unknown = [dep for dep in depends_on if dep not in self.tasks]
+        if unknown:
+            raise ValueError(f"{name!r} depends on unknown (or later) tasks {unknown}")
+        self.tasks[name] = (function, list(depends_on))
+
+    def _chain_lengths(self) -> dict:
+        """The number of tasks on the longest chain starting at each task."""
+        lengths = {}
+        for name in reversed(list(self.tasks)):
+            dependants = [other for other, (_, deps) in self.tasks.items() if name in deps]
+            lengths[name] = 1 + max((lengths[other] for other in dependants), default=0)
+        return lengths
+
+    def run(self, concurrency: int = 3) -> dict:
+        """
+        Runs every task and returns name -> output. If a task raises, no new tasks
+        are started, the running ones finish, and the exception is re-raised.
+        """
+        priority = self._chain_lengths()
+        outputs, running = {}, {}
+        waiting = list(self.tasks)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while waiting or running:
+                ready = [name for name in waiting if all(dep in outputs for dep in self.tasks[name][1])]
+                ready.sort(key=lambda name: -priority[name])
+                for name in ready[:concurrency - len(running)]:
+                    function, deps = self.tasks[name]
+                    waiting.remove(name)
+                    running[pool.submit(self._timed, name, function, {dep: outputs[dep] for dep in deps}, started)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    outputs[name] = future.result()
+        self.wall = time.perf_counter() - started
+        return outputs
+
+    def _timed(self, name: str, function, inputs: dict, started: float):
+        begin = time.perf_counter() - started
+        try:
+            return function(inputs)
+        finally:
+            self.timings[name] = (begin, time.perf_counter() - started)
+
+    def report(self) -> dict:
+        """
+        After run(): the sequential time (the sum of every task's duration, which is
+        what a sequential crew would have taken), the critical path (the longest
+        dependency chain by measured duration, the best any schedule can do), the
+        actual wall time, and the speedups.
+        """
+        duration = {name: end - start for name, (start, end) in self.timings.items()}
+        longest = {}
+        for name, (_, deps) in self.tasks.items():
+            before = max(deps, key=lambda dep: longest[dep][0], default=None)
+            base, path = longest[before] if before else (0.0, [])
+            longest[name] = (base + duration[name], path + [name])
+        critical, path = max(longest.values())
+        sequential = sum(duration.values())
+        return {
+            "sequential_seconds": sequential,
+            "critical_path": path,
+            "critical_path_seconds": critical,
+            "wall_seconds": self.wall,
+            "speedup": sequential / self.wall,
+            "max_speedup": sequential / critical,
+        }
+
+def crew_graph(tasks: list) -> TaskGraph:
+    """
+    A TaskGraph over crewai Tasks. A task's dependencies are its `context` list; a
+    task without one depends on every earlier task, as in a sequential crew. Each
+    task is given only its dependencies' outputs as context.
+    """
+    graph = TaskGraph()
+    names = {}
+    for i, task in enumerate(tasks):
+        role = task.agent.role
+        names[id(task)] = f"{i + 1}. {role if len(role) <= 40 else role[:39] + '…'}"
+        context = getattr(task, "context", None)
+        deps = [names[id(dep)] for dep in context] if isinstance(context, list) else list(graph.tasks)
+
+        def run(inputs, task=task):
+            context_text = "\n\n".join(str(output) for output in inputs.values())
+            return task.execute_sync(agent=task.agent, context=context_text or None)
+
+        graph.add(names[id(task)], run, deps)
+    return graph
+
+def print_report(report: dict):
+    print(f"Sequential: {report['sequential_seconds']:.1f}s   "
+          f"Scheduled: {report['wall_seconds']:.1f}s ({report['speedup']:.2f}x)   "
+          f"Critical path: {report['critical_path_seconds']:.1f}s (best possible {report['max_speedup']:.2f}x)")
+    print(f"Critical path: {' -> '.join(report['critical_path'])}")
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    # A stand-in for an LLM crew: each task sleeps for its "call" and echoes its inputs.
+    def llm_call(name: str, seconds: float):
+        def call(inputs):
+            time.sleep(seconds)
+            return f"{name}({', '.join(inputs)})"
+        return call
+
+    graph = TaskGraph()
+    graph.add("gene target", llm_call("gene", 1.0))
+    graph.add("protein structure", llm_call("protein", 1.2), ["gene target"])
+    graph.add("delivery system", llm_call("delivery", 1.4), ["gene target"])
+    graph.add("discovery loop", llm_call("discovery", 1.3), ["gene target", "protein structure"])
+    graph.add("science critique", llm_call("science critique", 0.8), ["protein structure", "discovery loop"])
+    graph.add("viability critique", llm_call("viability critique", 0.8), ["delivery system"])
+    graph.add("brief", llm_call("brief", 1.0), ["gene target", "discovery loop", "delivery system",
+                                               "science critique", "viability critique"])
+
+    outputs = graph.run(concurrency=3)
+    for name, (start, end) in sorted(graph.timings.items(), key=lambda item: item[1]):
+        print(f"  {start:4.1f}s - {end:4.1f}s  {name}")
+    print(f"\nbrief received: {outputs['brief']}\n")
+    print_report(graph.report())
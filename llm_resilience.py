@@ -0,0 +1,227 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that has been failing."""
+
+class CircuitBreaker:
+    """
+    Opens when at least `failure_ratio` of the last `window` calls failed (once
+    `min_calls` have been seen), so callers fail fast instead of piling onto a broken
+    upstream. A failure ratio rather than a run of consecutive failures keeps many
+    concurrent callers from tripping it on a few interleaved errors. After
+    `reset_timeout` seconds one trial call is let through (half-open); its success
+    closes the breaker, its failure re-opens it.
+    """
+
+    def __init__(self, failure_ratio: float = 0.5, window: int = 50, min_calls: int = 20,
+                 reset_timeout: float = 30.0):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.outcomes = deque(maxlen=window)
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            if not self.trial_in_flight:
+                return  # a straggler from before the breaker opened
+            self.opened_at = None
+            self.trial_in_flight = False
+            self.outcomes.clear()
+        self.outcomes.append(False)
+
+    def release(self):
+        """Gives up a half-open trial without an outcome (e.g. it was cancelled)."""
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        if self.opened_at is not None:
+            if self.trial_in_flight:
+                self.trial_in_flight = False
+                self.opened_at = time.monotonic()
+            return
+        self.outcomes.append(True)
+        if len(self.outcomes) >= self.min_calls and sum(self.outcomes) >= self.failure_ratio * len(self.outcomes):
+            self.opened_at = time.monotonic()
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Timeouts, connection errors and 5xx/408/409/429 responses are worth another
+    attempt; other 4xx responses will fail the same way again.
+    """
+    status = getattr(error, "status_code", None)
+    return status is None or status >= 500 or status in (408, 409, 429)
+
+class ResilientCaller:
+    """
+    Wraps calls to an LLM (or any async upstream) with:
+
+    - a deadline of `attempt_timeout` seconds per attempt,
+    - up to `max_attempts` attempts with full-jitter exponential backoff between them,
+    - a shared CircuitBreaker, and
+    - optional hedging: if an attempt hasn't answered by the `hedge_quantile` of
+      recent latencies, a second identical request is fired and whichever answers
+      first wins. The loser is cancelled.
+
+    `call` takes a zero-argument function returning a fresh awaitable, since each
+    attempt (and each hedge) needs its own request.
+    """
+
+    def __init__(self, attempt_timeout: float = 30.0, max_attempts: int = 3, backoff_base: float = 0.5,
+                 backoff_max: float = 8.0, breaker: CircuitBreaker | None = None, hedge: bool = False,
+                 hedge_quantile: float = 0.95, min_hedge_delay: float = 0.05, latency_window: int = 200,
+                 retryable=is_retryable, seed: int | None = None):
+        self.attempt_timeout = attempt_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.latencies = deque(maxlen=latency_window)
+        self.retryable = retryable
+        self._random = random.Random(seed)
+        self.stats = {"calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "timeouts": 0,
+                      "failures": 0, "short_circuited": 0}
+
+    def hedge_delay(self) -> float | None:
+        """The current hedging threshold, or None until enough latencies are known."""
+        if not self.hedge or len(self.latencies) < 20:
+            return None
+        ordered = sorted(self.latencies)
+        return max(self.min_hedge_delay, ordered[min(len(ordered) - 1, int(self.hedge_quantile * len(ordered)))])
+
+    async def _attempt(self, make_request):
+        started = time.monotonic()
+        primary = asyncio.ensure_future(make_request())
+        pending = {primary}
+        delay = self.hedge_delay()
+        try:
+            if delay is not None:
+                await asyncio.wait(pending, timeout=delay)
+                if not primary.done():
+                    self.stats["hedges"] += 1
+                    pending.add(asyncio.ensure_future(make_request()))
+            deadline = started + self.attempt_timeout
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.stats["timeouts"] += 1
+                    raise asyncio.TimeoutError(f"no answer within {self.attempt_timeout}s")
+                for task in done:
+                    if task.exception() is None:
+                        self.stats["hedge_wins"] += task is not primary
+                        self.latencies.append(time.monotonic() - started)
+                        return task.result()
+                # The finished request failed; keep waiting for the hedge, if one is running.
+                error = next(iter(done)).exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, make_request):
+        """
+        Runs the request with deadlines, retries, hedging and the circuit breaker.
+        Raises CircuitOpenError without calling out while the breaker is open, and
+        the last error once the attempts are used up.
+        """
+        self.stats["calls"] += 1
+        for attempt in range(self.max_attempts):
+            if not self.breaker.allow():
+                self.stats["short_circuited"] += 1
+                raise CircuitOpenError(f"circuit open after {sum(self.breaker.outcomes)} of the last "
+                                       f"{len(self.breaker.outcomes)} calls failed")
+            self.stats["attempts"] += 1
+            recorded = False
+            try:
+                result = await self._attempt(make_request)
+            except Exception as e:
+                retryable = self.retryable(e)
+                # Only errors that say the upstream is unhealthy count against it; a
+                # 400 means it answered.
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                recorded = True
+                if attempt + 1 == self.max_attempts or not retryable:
+                    self.stats["failures"] += 1
+                    raise
+                self.stats["retries"] += 1
+            else:
+                self.breaker.record_success()
+                recorded = True
+                return result
+            finally:
+                # Cancelled (a BaseException): free a half-open trial slot, or the
+                # breaker would never let another call through.
+                if not recorded:
+                    self.breaker.release()
+            await asyncio.sleep(self._random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    import json
+    from openai import AsyncOpenAI
+    from llm_standin import start_standin_server
+
+    async def scenario(name: str, caller: ResilientCaller, requests: int = 200, **faults):
+        server, base_url = start_standin_server(delay=0.05, **faults)
+        async with AsyncOpenAI(base_url=base_url, api_key="standin", max_retries=0) as client:
+            async def one():
+                started = time.monotonic()
+                try:
+                    await caller.call(lambda: client.chat.completions.create(
+                        model="standin", messages=[{"role": "user", "content": "ping"}]))
+                    return time.monotonic() - started
+                except Exception:
+                    return None
+
+            latencies = [await one() for _ in range(requests)]
+        server.shutdown()
+        answered = sorted(latency for latency in latencies if latency is not None)
+        print(f"--- {name} ---")
+        if answered:
+            print(f"  answered {len(answered)}/{requests}, p50 {answered[len(answered) // 2]:.3f}s, "
+                  f"p99 {answered[int(len(answered) * 0.99)]:.3f}s, breaker {caller.breaker.state}")
+        else:
+            print(f"  answered 0/{requests}, breaker {caller.breaker.state}")
+        print(f"  {json.dumps(caller.stats)}")
+
+    async def main():
+        # 5% of calls stall for 2s: retries alone wait out the deadline, hedging sidesteps it.
+        await scenario("slow tail, deadline + retries", ResilientCaller(attempt_timeout=0.5, seed=1),
+                       slow_rate=0.05, slow_delay=2.0)
+        await scenario("slow tail, hedged at p95", ResilientCaller(attempt_timeout=0.5, hedge=True, seed=1),
+                       slow_rate=0.05, slow_delay=2.0)
+        # 20% of calls fail with a 503: jittered retries absorb them.
+        await scenario("20% 503s", ResilientCaller(backoff_base=0.02, seed=1), fail_rate=0.2)
+        # A dead upstream: the breaker opens and later calls fail fast.
+        await scenario("upstream down", ResilientCaller(backoff_base=0.02, breaker=CircuitBreaker(reset_timeout=60), seed=1),
+                       requests=20, fail_rate=1.0)
+
+    asyncio.run(main())
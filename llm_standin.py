@@ -0,0 +1,270 @@
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A local, OpenAI-compatible stand-in for the LLM. Point a client at it with
+# OpenAI(base_url=base_url, api_key="standin") to exercise the pipelines offline.
+
+def default_reply(messages: list[dict]) -> str:
+    """
+    A canned answer: a low-concern verdict for every prompt.
+    """
+    return json.dumps({"intent": "automated client", "concern": "low"})
+
+def proposals_reply(messages: list[dict]) -> str:
+    """
+    Three canned rerouting options in the shape logistics.ai_logistics_analyst expects.
+    """
+    return json.dumps({"options": [
+        {"name": "Southern Reroute via I-40", "strategy": "Divert south to I-40 before the storm front.",
+         "cost_impact": 1800, "eta_impact_hours": 10, "risk": "Low; longer but clear of the storm."},
+        {"name": "Hold in Kansas City", "strategy": "Wait out the closures at the Kansas City depot.",
+         "cost_impact": 950, "eta_impact_hours": 48, "risk": "Medium; depends on the closures lifting on time."},
+        {"name": "Transload to Rail", "strategy": "Move the load to an eastbound intermodal train.",
+         "cost_impact": 4200, "eta_impact_hours": 18, "risk": "Medium; needs a same-day rail slot."},
+    ]})
+
+def completion_object(request: dict, content: str, completion_id: str) -> dict:
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "standin"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Serves POST /v1/chat/completions with the server's reply function. Requests with
+    "stream": true get the reply as server-sent chunks of `chunk_chars` characters,
+    one every `chunk_delay` seconds, the way a model emits tokens.
+
+    Also serves a minimal Files + Batches API (upload a JSONL of chat requests, create
+    a batch, poll it or list batches newest first, download the output file),
+    processing `batch_delay` seconds per request on a background thread.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients reuse connections
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        if path.endswith("/files"):
+            self._upload_file(body)
+        elif path.endswith("/batches"):
+            self._create_batch(json.loads(body or b"{}"))
+        elif path.endswith("/chat/completions"):
+            self._chat_completion(json.loads(body or b"{}"))
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        file_content = re.search(r"/files/([^/]+)/content$", path)
+        batch = re.search(r"/batches/([^/]+)$", path)
+        if file_content and file_content.group(1) in self.server.files:
+            self._send(self.server.files[file_content.group(1)]["content"], "application/octet-stream")
+        elif batch and batch.group(1) in self.server.batches:
+            with self.server.batch_lock:
+                self._send_json(self.server.batches[batch.group(1)])
+        elif path.endswith("/batches"):
+            with self.server.batch_lock:
+                self._send_json({"object": "list", "data": list(reversed(self.server.batches.values())),
+                                 "has_more": False})
+        else:
+            self.send_error(404)
+
+    def _send(self, body: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, payload: dict):
+        self._send(json.dumps(payload).encode(), "application/json")
+
+    def _upload_file(self, body: bytes):
+        form = BytesParser(policy=HTTP).parsebytes(
+            b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + body)
+        fields = {part.get_param("name", header="content-disposition"): part for part in form.iter_parts()}
+        upload = fields["file"]
+        file_object = {
+            "id": f"file-standin-{len(self.server.files) + 1}",
+            "object": "file",
+            "bytes": len(upload.get_payload(decode=True)),
+            "created_at": int(time.time()),
+            "filename": upload.get_filename() or "upload.jsonl",
+            "purpose": fields["purpose"].get_content().strip() if "purpose" in fields else "batch",
+            "status": "processed",
+        }
+        self.server.files[file_object["id"]] = dict(file_object, content=upload.get_payload(decode=True))
+        self._send_json(file_object)
+
+    def _create_batch(self, request: dict):
+        if request.get("input_file_id") not in self.server.files:
+            self.send_error(400, "Unknown input_file_id")
+            return
+        lines = self.server.files[request["input_file_id"]]["content"].splitlines()
+        batch = {
+            "id": f"batch_standin_{len(self.server.batches) + 1}",
+            "object": "batch",
+            "endpoint": request.get("endpoint", "/v1/chat/completions"),
+            "input_file_id": request["input_file_id"],
+            "completion_window": request.get("completion_window", "24h"),
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+            "metadata": request.get("metadata"),
+        }
+        with self.server.batch_lock:
+            self.server.batches[batch["id"]] = batch
+        threading.Thread(target=self.server.run_batch, args=(batch, lines), daemon=True).start()
+        self._send_json(batch)
+
+    def _chat_completion(self, request: dict):
+        # Fault injection: scripted faults first, then a share of requests fail
+        # outright and another share stall.
+        try:
+            fault = self.server.faults.popleft()
+        except IndexError:
+            fault = "fail" if random.random() < self.server.fail_rate else None
+            fault = fault or ("slow" if random.random() < self.server.slow_rate else None)
+        if fault == "fail":
+            time.sleep(self.server.delay)
+            self.send_response(self.server.fail_status)
+            if self.server.fail_status == 429:
+                self.send_header("Retry-After", "0")
+            self.send_header("Content-Type", "application/json")
+            body = json.dumps({"error": {"message": "Injected failure", "code": self.server.fail_status}}).encode()
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if fault == "slow":
+            time.sleep(self.server.slow_delay)
+        time.sleep(self.server.delay)
+
+        self.server.requests_served += 1
+        content = self.server.reply(request.get("messages", []))
+        if request.get("stream"):
+            self._stream(request, content)
+            return
+        self._send_json(completion_object(request, content, f"chatcmpl-standin-{self.server.requests_served}"))
+
+    def _stream(self, request: dict, content: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(delta: dict, finish_reason: str | None = None):
+            chunk = {
+                "id": f"chatcmpl-standin-{self.server.requests_served}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "standin"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+            self.wfile.flush()
+
+        send({"role": "assistant", "content": ""})
+        size = self.server.chunk_chars
+        for start in range(0, len(content), size):
+            time.sleep(self.server.chunk_delay)
+            send({"content": content[start:start + size]})
+        send({}, "stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, format, *args):
+        pass
+
+class StandInServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 stalls bursts of hundreds of concurrent clients.
+    request_queue_size = 1024
+
+    def run_batch(self, batch: dict, lines: list[bytes]):
+        output = []
+        for i, line in enumerate(lines):
+            time.sleep(self.batch_delay)
+            item = json.loads(line)
+            body = item.get("body", {})
+            content = self.reply(body.get("messages", []))
+            output.append(json.dumps({
+                "id": f"batch_req_{i + 1}",
+                "custom_id": item.get("custom_id"),
+                "response": {"status_code": 200, "request_id": f"req_{i + 1}",
+                             "body": completion_object(body, content, f"chatcmpl-{batch['id']}-{i + 1}")},
+                "error": None,
+            }))
+            with self.batch_lock:
+                batch["request_counts"]["completed"] += 1
+        file_id = f"file-standin-{len(self.files) + 1}"
+        content = ("\n".join(output) + "\n").encode()
+        self.files[file_id] = {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                               "filename": "batch_output.jsonl", "purpose": "batch_output", "status": "processed",
+                               "content": content}
+        with self.batch_lock:
+            batch["output_file_id"] = file_id
+            batch["status"] = "completed"
+            batch["completed_at"] = int(time.time())
+
+    def handle_error(self, request, client_address):
+        # Clients that time out or cancel a hedged request hang up mid-reply; that's expected.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+def start_standin_server(port: int = 0, delay: float = 0.05, reply=default_reply, chunk_delay: float = 0.01,
+                         chunk_chars: int = 4, fail_rate: float = 0.0, slow_rate: float = 0.0, slow_delay: float = 5.0,
+                         batch_delay: float = 0.001, fail_status: int = 503):
+    """
+    Starts the stand-in on a background thread and returns (server, base_url).
+    `fail_rate` of requests get a `fail_status` error and `slow_rate` take
+    `slow_delay` extra seconds. For exact sequences, append "fail", "slow" or None
+    to server.faults; each chat request consumes one before the rates apply.
+    Call server.shutdown() when done.
+    """
+    server = StandInServer(("127.0.0.1", port), StandInHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.reply = reply
+    server.chunk_delay = chunk_delay
+    server.chunk_chars = chunk_chars
+    server.fail_rate = fail_rate
+    server.slow_rate = slow_rate
+    server.slow_delay = slow_delay
+    server.fail_status = fail_status
+    server.faults = deque()
+    server.requests_served = 0
+    server.batch_delay = batch_delay
+    server.files = {}
+    server.batches = {}
+    server.batch_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    server, base_url = start_standin_server(port=8089)
+    print(f"Stand-in LLM listening on {base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,137 @@
+import random
+import time
+
+from log_aggregation import CountMinSketch
+
+# How much more likely a record of each status class is to be kept under overload.
+DEFAULT_STATUS_WEIGHTS = {"5": 8.0, "4": 4.0, "3": 1.0, "2": 1.0, "1": 1.0, None: 2.0}
+# Weights below this (including 0) are raised to it: such a class is kept only when
+# there is no pressure at all, and the rate ceiling 1 / min(weights) stays finite.
+MIN_STATUS_WEIGHT = 0.01
+
+class AdmissionController:
+    """
+    Adaptive admission control between the translator and the LLM.
+
+    Every record gets a priority weight from its status class and its novelty (how
+    rarely its path/status/user-agent key has been seen lately, tracked in a decaying
+    Count-Min sketch). It is admitted with probability min(1, rate * weight). Once per
+    `interval` the rate is adjusted: it is cut in proportion whenever the admitted
+    rate exceeds `target_rps` or the downstream queue is deeper than `max_queue_depth`,
+    and grows back gradually otherwise. With no pressure every record is admitted.
+
+    Admitted records carry `represents`, the inverse of their admission probability,
+    so downstream counts stay unbiased estimates of the real traffic.
+    """
+
+    def __init__(self, target_rps: float = 10.0, max_queue_depth: int = 100, interval: float = 1.0,
+                 status_weights: dict | None = None, novelty_boost: float = 4.0, recovery: float = 1.25,
+                 seed: int | None = None):
+        self.target_rps = target_rps
+        self.max_queue_depth = max_queue_depth
+        self.interval = interval
+        self.status_weights = {status_class: max(float(weight), MIN_STATUS_WEIGHT)
+                               for status_class, weight in (status_weights or DEFAULT_STATUS_WEIGHTS).items()}
+        self.novelty_boost = novelty_boost
+        self.recovery = recovery
+        self._random = random.Random(seed)
+        self._seen = CountMinSketch(width=4096, depth=4)
+        # Classes missing from the table weigh 1.0 (see weight()), so they count too.
+        self.max_rate = 1.0 / min(1.0, *self.status_weights.values())
+        self.rate = self.max_rate
+        self._window_start = None
+        self._window_admitted = 0
+        self._queue_depth = 0
+        self.offered = 0
+        self.admitted = 0
+        self.dropped_by_status = {}
+
+    def weight(self, log_entry: dict) -> float:
+        status = log_entry.get("status")
+        status_class = str(status)[:1] if status is not None else None
+        weight = self.status_weights.get(status_class, 1.0)
+        key = f"{log_entry.get('path')}|{status_class}|{log_entry.get('user_agent')}"
+        seen = self._seen.add(key)
+        # A key's first few appearances are boosted; the boost fades as it becomes familiar.
+        return weight * (1.0 + self.novelty_boost / seen)
+
+    def _adjust(self, now: float):
+        elapsed = now - self._window_start
+        if elapsed <= 0:
+            # With interval <= 0 (or a clock that stepped back) there is no window to
+            # measure yet; keep counting into the current one.
+            return
+        admitted_rps = self._window_admitted / elapsed
+        pressure = max(admitted_rps / self.target_rps, self._queue_depth / self.max_queue_depth)
+        if pressure > 1.0:
+            self.rate /= pressure
+        else:
+            self.rate = min(self.max_rate, self.rate * self.recovery)
+        self._window_start = now
+        self._window_admitted = 0
+        # Let novelty decay, so a key that was common an hour ago can be novel again.
+        for row in self._seen.rows:
+            for i in range(len(row)):
+                row[i] >>= 1
+
+    def offer(self, log_entry: dict, queue_depth: int | None = None, now: float | None = None) -> tuple[bool, float]:
+        """
+        Decides whether one record goes to the LLM. Returns (admitted, represents).
+        `queue_depth` is the current depth of the downstream LLM queue, if known.
+        """
+        if now is None:
+            now = time.monotonic()
+        if queue_depth is not None:
+            self._queue_depth = queue_depth
+        if self._window_start is None:
+            self._window_start = now
+        elif now - self._window_start >= self.interval:
+            self._adjust(now)
+
+        self.offered += 1
+        probability = min(1.0, self.rate * self.weight(log_entry))
+        if self._random.random() < probability:
+            self.admitted += 1
+            self._window_admitted += 1
+            return True, 1.0 / probability
+
+        status = log_entry.get("status")
+        status_class = f"{str(status)[:1]}xx" if status is not None else "unknown"
+        self.dropped_by_status[status_class] = self.dropped_by_status.get(status_class, 0) + 1
+        return False, 0.0
+
+    def stats(self) -> dict:
+        return {
+            "offered": self.offered,
+            "admitted": self.admitted,
+            "dropped": self.offered - self.admitted,
+            "dropped_by_status": dict(sorted(self.dropped_by_status.items())),
+            "admission_rate": round(self.admitted / self.offered, 4) if self.offered else 1.0,
+            "sampling_rate": round(self.rate, 6),
+        }
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    import json
+
+    rng = random.Random(3)
+    controller = AdmissionController(target_rps=20, seed=1)
+    start = 1761472800.0
+    admitted_errors = 0
+    steady_admitted = 0
+    # One minute of a flood: 2,000 requests/sec, mostly 200s from a botnet, some 5xx fallout.
+    for i in range(120_000):
+        now = start + i / 2000
+        log_entry = {
+            "timestamp": now,
+            "path": f"/api/v1/item/{rng.randrange(50)}",
+            "status": 500 if rng.random() < 0.01 else 200,
+            "user_agent": "Python-requests/2.25.1",
+        }
+        admitted, represents = controller.offer(log_entry, now=now)
+        admitted_errors += admitted and log_entry["status"] == 500
+        steady_admitted += admitted and i >= 60_000
+
+    print(json.dumps(controller.stats(), indent=2))
+    print(f"Admitted {steady_admitted / 30:.1f} records/sec over the last 30s against a target of 20; "
+          f"{admitted_errors} of {controller.admitted} admitted records were 5xx (1% of the traffic).")
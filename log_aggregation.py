@@ -0,0 +1,250 @@
+import math
+import random
+import re
+from array import array
+from datetime import datetime, timezone
+
+from data2sentence import server_log_to_sentence, create_multimodal_prompt, timestamp_to_epoch
+
+# Latency varies on every request, so it is summarised as percentiles instead of
+# being part of the key. Purely numeric path segments (IDs) are collapsed as well.
+_LATENCY_TOKEN = re.compile(r" ?LATENCY_MS_\S+")
+_NUMERIC_SEGMENT = re.compile(r"/\d+(?=[/\s?]|$)")
+
+def normalize_sentence(sentence: str) -> str:
+    """
+    Maps near-identical log sentences to the same aggregation key, e.g.
+    "STATUS_404 PATH_/orders/123 LATENCY_MS_87" -> "STATUS_404 PATH_/orders/{id}".
+    """
+    sentence = _LATENCY_TOKEN.sub("", sentence)
+    return _NUMERIC_SEGMENT.sub("/{id}", sentence).strip()
+
+class CountMinSketch:
+    """
+    A fixed-size approximate counter for the long tail of sentences.
+    Estimates never undercount; with conservative updates they rarely overcount by much.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array("Q", bytes(8 * width)) for _ in range(depth)]
+
+    def _cells(self, key: str):
+        return [(row, hash((i, key)) % self.width) for i, row in enumerate(self.rows)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Adds `count` to `key` and returns its new estimate."""
+        cells = self._cells(key)
+        estimate = min(row[i] for row, i in cells) + count
+        for row, i in cells:
+            if row[i] < estimate:
+                row[i] = estimate
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[i] for row, i in self._cells(key))
+
+class _Entry:
+    """Exact statistics for one hot sentence within the current window."""
+
+    __slots__ = ("sentence", "count", "first_seen", "last_seen", "latencies", "seen_latencies", "approximate")
+
+    def __init__(self, sentence: str, count: int, timestamp, approximate: bool):
+        self.sentence = sentence
+        self.count = count
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.latencies = []
+        self.seen_latencies = 0
+        self.approximate = approximate
+
+class SentenceAggregator:
+    """
+    Collapses identical or near-identical log sentences over tumbling time windows.
+
+    Up to `max_keys` hot sentences per window are tracked exactly, with a count,
+    first/last timestamps and a bounded latency reservoir for percentiles. Everything
+    else is only counted in a Count-Min sketch; a tail sentence is promoted into the
+    exact table once its estimated count overtakes the coldest tracked sentence.
+    Memory is bounded by max_keys, the reservoir size and the sketch dimensions.
+    """
+
+    def __init__(self, window_seconds: float = 60.0, max_keys: int = 10_000, reservoir_size: int = 128,
+                 sketch_width: int = 2048, sketch_depth: int = 4, normalize=normalize_sentence, seed: int = 0):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self.reservoir_size = reservoir_size
+        self.sketch_width = sketch_width
+        self.sketch_depth = sketch_depth
+        self.normalize = normalize
+        self._random = random.Random(seed)
+        self._reset(None)
+
+    def _reset(self, window_start):
+        self.window_start = window_start
+        self.entries = {}
+        self.sketch = CountMinSketch(self.sketch_width, self.sketch_depth)
+        self.total = 0
+        self.tail_count = 0
+        # A lower bound on the smallest tracked count. Counts only grow, so tail
+        # records at or below it can be rejected without scanning the table.
+        self._coldest_floor = 0
+
+    def add(self, sentence: str, timestamp=None, latency_ms=None) -> list[dict]:
+        """
+        Adds one log sentence. Returns the aggregated entries of the previous window
+        when this record opens a new one, otherwise an empty list. A timestamp that
+        can't be read counts as missing, so the record joins the current window; so
+        does a latency that isn't a finite number, which is then left out of the sample.
+        """
+        timestamp = timestamp_to_epoch(timestamp)
+        try:
+            latency_ms = float(latency_ms) if latency_ms is not None else None
+        except (TypeError, ValueError):
+            latency_ms = None
+        if latency_ms is not None and not math.isfinite(latency_ms):
+            latency_ms = None
+        closed = []
+        if timestamp is not None:
+            window_start = timestamp - timestamp % self.window_seconds
+            if self.window_start is None:
+                self.window_start = window_start
+            elif window_start > self.window_start:
+                closed = self.flush()
+                self.window_start = window_start
+            # Late records from an already-closed window are folded into the current one.
+
+        key = self.normalize(sentence)
+        self.total += 1
+        entry = self.entries.get(key)
+        if entry is None:
+            estimate = self.sketch.add(key)
+            if len(self.entries) < self.max_keys:
+                entry = self.entries[key] = _Entry(key, 0, timestamp, approximate=estimate > 1)
+                entry.count = estimate - 1
+            else:
+                if estimate <= self._coldest_floor:
+                    self.tail_count += 1
+                    return closed
+                coldest = min(self.entries.values(), key=lambda e: e.count)
+                self._coldest_floor = coldest.count
+                if estimate <= coldest.count:
+                    self.tail_count += 1
+                    return closed
+                del self.entries[coldest.sentence]
+                self.tail_count = max(0, self.tail_count + coldest.count - (estimate - 1))
+                entry = self.entries[key] = _Entry(key, estimate - 1, timestamp, approximate=True)
+
+        entry.count += 1
+        if timestamp is not None:
+            if entry.first_seen is None or timestamp < entry.first_seen:
+                entry.first_seen = timestamp
+            if entry.last_seen is None or timestamp > entry.last_seen:
+                entry.last_seen = timestamp
+        if latency_ms is not None:
+            self._sample_latency(entry, latency_ms)
+        return closed
+
+    def _sample_latency(self, entry: _Entry, latency_ms: float):
+        """Reservoir sampling keeps a uniform sample of at most reservoir_size latencies."""
+        entry.seen_latencies += 1
+        if len(entry.latencies) < self.reservoir_size:
+            entry.latencies.append(latency_ms)
+        else:
+            slot = self._random.randrange(entry.seen_latencies)
+            if slot < self.reservoir_size:
+                entry.latencies[slot] = latency_ms
+
+    def add_log(self, log_entry: dict, source: str = "default") -> list[dict]:
+        """
+        Translates and adds a raw log dictionary, taking its timestamp and latency_ms.
+        """
+        return self.add(server_log_to_sentence(log_entry, source),
+                        log_entry.get("timestamp"), log_entry.get("latency_ms"))
+
+    def flush(self) -> list[dict]:
+        """
+        Closes the current window and returns its entries, most frequent first.
+        Sentences that never made it into the exact table are reported as one
+        "OTHER" entry so that the counts still add up.
+        """
+        results = []
+        for entry in sorted(self.entries.values(), key=lambda e: e.count, reverse=True):
+            latencies = sorted(entry.latencies)
+            results.append({
+                "sentence": entry.sentence,
+                "count": entry.count,
+                "approximate": entry.approximate,
+                "first_seen": entry.first_seen,
+                "last_seen": entry.last_seen,
+                "latency_p50": _percentile(latencies, 0.50),
+                "latency_p95": _percentile(latencies, 0.95),
+                "latency_p99": _percentile(latencies, 0.99),
+            })
+        if self.tail_count:
+            results.append({
+                "sentence": "OTHER",
+                "count": self.tail_count,
+                "approximate": True,
+                "first_seen": None,
+                "last_seen": None,
+                "latency_p50": None,
+                "latency_p95": None,
+                "latency_p99": None,
+            })
+        self._reset(self.window_start)
+        return results
+
+def _percentile(sorted_values: list, q: float):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def _format_timestamp(epoch) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def aggregate_to_sentence(entry: dict) -> str:
+    """
+    Renders an aggregated entry as a log sentence for create_multimodal_prompt.
+    """
+    parts = [entry["sentence"], f"COUNT_{'~' if entry['approximate'] else ''}{entry['count']}"]
+    if entry["first_seen"] is not None:
+        parts.append(f"FIRST_SEEN_{_format_timestamp(entry['first_seen'])}")
+        parts.append(f"LAST_SEEN_{_format_timestamp(entry['last_seen'])}")
+    for label in ("p50", "p95", "p99"):
+        value = entry[f"latency_{label}"]
+        if value is not None:
+            parts.append(f"LATENCY_{label.upper()}_MS_{value:g}")
+    return " ".join(parts)
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    # A script hammering one endpoint, plus a little ordinary traffic.
+    aggregator = SentenceAggregator(window_seconds=60)
+    for i in range(5000):
+        aggregator.add_log({
+            "timestamp": 1761472800 + i * 0.01,
+            "method": "GET",
+            "path": "/api/v1/user/settings",
+            "status": 403,
+            "latency_ms": 140 + i % 25,
+            "user_agent": "Python-requests/2.25.1",
+        })
+        if i % 500 == 0:
+            aggregator.add_log({
+                "timestamp": 1761472800 + i * 0.01,
+                "method": "GET",
+                "path": f"/api/v1/orders/{i}",
+                "status": 200,
+                "latency_ms": 80,
+                "user_agent": "Mozilla/5.0",
+            })
+
+    total = aggregator.total
+    entries = aggregator.flush()
+    print(f"--- {total} records collapsed into {len(entries)} entries ---")
+    human_context = "We've been seeing a series of failed API calls from a script, not a browser."
+    for entry in entries:
+        print(create_multimodal_prompt(aggregate_to_sentence(entry), human_context))
@@ -0,0 +1,199 @@
+import math
+import time
+from array import array
+
+from data2sentence import server_log_to_sentence, create_multimodal_prompt, timestamp_to_epoch
+
+# Latency histograms use half-octave buckets in milliseconds: 0-1, 1-1.4, 1.4-2, ..., ~16 minutes+.
+LATENCY_BUCKETS = 40
+
+def _latency_bucket(latency_ms: float) -> int:
+    return min(LATENCY_BUCKETS - 1, int(2 * math.log2(max(0.0, latency_ms) + 1)))
+
+class BaselineTable:
+    """
+    Rolling per-key baselines in a fixed number of hashed slots.
+
+    Each slot keeps a fast and a slow EWMA request rate, EWMA ratios of 4xx and 5xx
+    responses, and an exponentially decayed latency histogram from which tail
+    probabilities are read. Memory is fixed at construction: keys that hash to the
+    same slot simply share a baseline.
+    """
+
+    def __init__(self, slots: int = 4096, fast_tau: float = 10.0, slow_tau: float = 600.0, alpha: float = 0.02):
+        self.slots = slots
+        self.fast_tau = fast_tau
+        self.slow_tau = slow_tau
+        self.alpha = alpha
+        self.count = array("L", bytes(array("L").itemsize * slots))
+        self.last_seen = array("d", bytes(8 * slots))
+        self.fast_rate = array("d", bytes(8 * slots))
+        self.slow_rate = array("d", bytes(8 * slots))
+        self.ratio_4xx = array("d", bytes(8 * slots))
+        self.ratio_5xx = array("d", bytes(8 * slots))
+        self.latency = array("d", bytes(8 * slots * LATENCY_BUCKETS))
+
+    def slot(self, key) -> int:
+        return hash(key) % self.slots
+
+    def score(self, slot: int, now: float, status_class: int | None, latency_ms: float | None) -> dict:
+        """
+        Scores one observation against the slot's baseline (before it is updated).
+        Each component is in bits of surprise, so they can simply be added.
+        """
+        components = {}
+        if status_class in (4, 5):
+            ratio = self.ratio_4xx[slot] if status_class == 4 else self.ratio_5xx[slot]
+            components["status"] = -math.log2(max(ratio, 1e-3))
+
+        if latency_ms is not None:
+            base = slot * LATENCY_BUCKETS
+            total = sum(self.latency[base:base + LATENCY_BUCKETS])
+            if total > 0:
+                tail = sum(self.latency[base + _latency_bucket(latency_ms):base + LATENCY_BUCKETS])
+                components["latency"] = -math.log2(max(tail / total, 1e-3))
+
+        if self.count[slot]:
+            fast, slow = self._decayed_rates(slot, now)
+            fast += 1 / self.fast_tau
+            slow += 1 / self.slow_tau
+            components["rate"] = max(0.0, math.log2(fast / slow))
+        return components
+
+    def _decayed_rates(self, slot: int, now: float) -> tuple[float, float]:
+        elapsed = max(0.0, now - self.last_seen[slot])
+        return (self.fast_rate[slot] * math.exp(-elapsed / self.fast_tau),
+                self.slow_rate[slot] * math.exp(-elapsed / self.slow_tau))
+
+    def update(self, slot: int, now: float, status_class: int | None, latency_ms: float | None):
+        fast, slow = self._decayed_rates(slot, now)
+        self.fast_rate[slot] = fast + 1 / self.fast_tau
+        self.slow_rate[slot] = slow + 1 / self.slow_tau
+        self.last_seen[slot] = now
+        self.count[slot] += 1
+
+        if status_class is not None:
+            alpha = self.alpha
+            self.ratio_4xx[slot] += alpha * ((status_class == 4) - self.ratio_4xx[slot])
+            self.ratio_5xx[slot] += alpha * ((status_class == 5) - self.ratio_5xx[slot])
+
+        if latency_ms is not None:
+            base = slot * LATENCY_BUCKETS
+            keep = 1 - self.alpha
+            for i in range(base, base + LATENCY_BUCKETS):
+                self.latency[i] *= keep
+            self.latency[base + _latency_bucket(latency_ms)] += 1.0
+
+class AnomalyPreFilter:
+    """
+    A cheap streaming scorer that sits in front of create_multimodal_prompt and only
+    forwards records whose anomaly score reaches `threshold`.
+
+    Records are scored against rolling baselines for their path and for their user
+    agent; the record's score is the larger of the two. Baselines that have seen fewer
+    than `warmup` records add a novelty bonus, so new endpoints and clients are
+    looked at before they become "normal".
+    """
+
+    def __init__(self, threshold: float = 6.0, slots: int = 4096, warmup: int = 20, novelty: float = 6.0, **baseline_options):
+        self.threshold = threshold
+        self.warmup = warmup
+        self.novelty = novelty
+        self.by_path = BaselineTable(slots, **baseline_options)
+        self.by_user_agent = BaselineTable(slots, **baseline_options)
+        self.seen = 0
+        self.forwarded = 0
+
+    def score(self, log_entry: dict, now: float | None = None) -> float:
+        """
+        Scores a record and folds it into the baselines.
+        """
+        if now is None:
+            now = timestamp_to_epoch(log_entry.get("timestamp"))
+        if now is None:
+            now = time.time()
+        status = log_entry.get("status")
+        try:
+            status_class = int(status) // 100 if status is not None else None
+        except (TypeError, ValueError):
+            status_class = None
+        try:
+            latency_ms = float(log_entry["latency_ms"])
+        except (KeyError, TypeError, ValueError):
+            latency_ms = None
+        if latency_ms is not None and not math.isfinite(latency_ms):
+            latency_ms = None
+
+        best = 0.0
+        for table, key in ((self.by_path, log_entry.get("path")), (self.by_user_agent, log_entry.get("user_agent"))):
+            slot = table.slot(key)
+            total = sum(table.score(slot, now, status_class, latency_ms).values())
+            if table.count[slot] < self.warmup:
+                total += self.novelty * (1 - table.count[slot] / self.warmup)
+            table.update(slot, now, status_class, latency_ms)
+            best = max(best, total)
+        return best
+
+    def should_forward(self, log_entry: dict, now: float | None = None) -> tuple[bool, float]:
+        score = self.score(log_entry, now)
+        forward = score >= self.threshold
+        self.seen += 1
+        self.forwarded += forward
+        return forward, score
+
+    def filter(self, log_entries):
+        """
+        Yields (log_entry, score) for the records that should reach the LLM.
+        """
+        for log_entry in log_entries:
+            forward, score = self.should_forward(log_entry)
+            if forward:
+                yield log_entry, score
+
+    def stats(self) -> dict:
+        suppressed = self.seen - self.forwarded
+        return {
+            "seen": self.seen,
+            "forwarded": self.forwarded,
+            "suppressed": suppressed,
+            "suppressed_fraction": round(suppressed / self.seen, 4) if self.seen else 0.0,
+            "threshold": self.threshold,
+        }
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    import json
+    import random
+
+    rng = random.Random(7)
+    logs = []
+    start = 1761472800.0
+    # Ten minutes of routine browser traffic...
+    for i in range(6000):
+        logs.append({
+            "timestamp": start + i * 0.1,
+            "method": "GET",
+            "path": rng.choice(["/", "/api/v1/orders", "/api/v1/user/settings", "/static/app.js"]),
+            "status": 200 if rng.random() > 0.01 else 404,
+            "latency_ms": rng.lognormvariate(4, 0.3),
+            "user_agent": rng.choice(["Mozilla/5.0 (Windows NT 10.0)", "Mozilla/5.0 (Macintosh)"]),
+        })
+    # ...then a script starts probing the settings endpoint.
+    for i in range(20):
+        logs.append({
+            "timestamp": start + 600 + i * 0.05,
+            "method": "GET",
+            "path": "/api/v1/user/settings",
+            "status": 403,
+            "latency_ms": 150,
+            "user_agent": "Python-requests/2.25.1",
+        })
+
+    prefilter = AnomalyPreFilter()
+    human_context = "We've been seeing a series of failed API calls from a script, not a browser."
+    forwarded = list(prefilter.filter(logs))
+    print(json.dumps(prefilter.stats(), indent=2))
+    print(f"Forwarded script requests: {sum(1 for log, _ in forwarded if log['status'] == 403)} of 20")
+    log_entry, score = forwarded[-1]
+    print(f"\n--- Last forwarded prompt (score {score:.1f}) ---")
+    print(create_multimodal_prompt(server_log_to_sentence(log_entry), human_context))
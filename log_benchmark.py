@@ -0,0 +1,223 @@
+import argparse
+import bisect
+import gc
+import json
+import platform
+import random
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+from itertools import accumulate
+
+from data2sentence import server_log_to_sentence, create_multimodal_prompt, pack_prompts
+
+# --- Synthetic Log Generator ---
+
+METHODS = ["GET"] * 80 + ["POST"] * 15 + ["PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"]
+USER_AGENTS = [
+    ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/124.0 Safari/537.36", 45),
+    ("Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 Version/17.4 Safari/605.1.15", 25),
+    ("Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) Mobile/15E148", 15),
+    ("Python-requests/2.25.1", 6),
+    ("curl/8.5.0", 4),
+    ("Googlebot/2.1 (+http://www.google.com/bot.html)", 5),
+]
+
+def generate_logs(n: int, seed: int = 0, distinct_paths: int = 500, zipf_s: float = 1.1,
+                  error_rate: float = 0.02, incident_rate: float = 0.001, incident_length: int = 2000,
+                  missing_rate: float = 0.01, requests_per_sec: float = 500.0):
+    """
+    Yields `n` realistic access-log dictionaries, reproducibly for a given seed.
+
+    - Paths follow a Zipf distribution over `distinct_paths` endpoints.
+    - Errors are bursty: normally `error_rate` of responses are 4xx/5xx, but incidents
+      start with probability `incident_rate` per record and, for about
+      `incident_length` records, push errors and latency way up.
+    - Each optional field goes missing with probability `missing_rate`.
+    """
+    rng = random.Random(seed)
+    paths = [f"/api/v1/resource{i}" if i % 3 else f"/api/v1/resource{i}/items/{i * 7}" for i in range(distinct_paths)]
+    path_weights = list(accumulate(1 / (rank ** zipf_s) for rank in range(1, distinct_paths + 1)))
+    agent_weights = list(accumulate(weight for _, weight in USER_AGENTS))
+
+    timestamp = 1761472800.0
+    incident_left = 0
+    for _ in range(n):
+        timestamp += rng.expovariate(requests_per_sec)
+        if incident_left == 0 and rng.random() < incident_rate:
+            incident_left = int(rng.expovariate(1 / incident_length)) + 1
+        in_incident = incident_left > 0
+        incident_left = max(0, incident_left - 1)
+
+        if rng.random() < (0.4 if in_incident else error_rate):
+            status = rng.choice([400, 401, 403, 404, 404, 429, 500, 502, 503, 504])
+        else:
+            status = rng.choice([200] * 18 + [201, 304])
+        latency = rng.lognormvariate(4.0, 0.6) * (8 if in_incident else 1)
+
+        log_entry = {
+            "timestamp": datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "method": rng.choice(METHODS),
+            "path": paths[bisect.bisect(path_weights, rng.random() * path_weights[-1])],
+            "status": status,
+            "latency_ms": round(latency),
+            "user_agent": USER_AGENTS[bisect.bisect(agent_weights, rng.random() * agent_weights[-1])][0],
+        }
+        for key in ("method", "latency_ms", "user_agent"):
+            if rng.random() < missing_rate:
+                del log_entry[key]
+        yield log_entry
+
+def write_ndjson(path: str, n: int, seed: int = 0, **options):
+    """
+    Writes a synthetic NDJSON access log, e.g. to feed the bulk mode of data2sentence.
+    """
+    with open(path, "w") as f:
+        for log_entry in generate_logs(n, seed, **options):
+            f.write(json.dumps(log_entry))
+            f.write("\n")
+
+# --- Benchmarks ---
+
+def _peak_rss_mb() -> float:
+    # The whole process's peak so far, so it never goes down from one benchmark to the
+    # next; reports label it cumulative. ru_maxrss is in kilobytes on Linux and in
+    # bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _percentiles(samples_ns: list[int]) -> dict:
+    samples_ns.sort()
+    last = len(samples_ns) - 1
+    return {
+        f"p{label}_us": round(samples_ns[min(last, int(q * len(samples_ns)))] / 1000, 3)
+        for label, q in (("50", 0.50), ("90", 0.90), ("99", 0.99), ("999", 0.999))
+    }
+
+def run_benchmark(name: str, func, items: list, repeat: int = 3) -> dict:
+    """
+    Times `func` over every item. Throughput is the best of `repeat` untimed-per-call
+    passes; per-record latency percentiles come from one separately timed pass.
+    """
+    gc.collect()
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - started)
+
+    clock = time.perf_counter_ns
+    samples = []
+    for item in items:
+        started = clock()
+        func(item)
+        samples.append(clock() - started)
+
+    result = {
+        "name": name,
+        "records": len(items),
+        "seconds": round(best, 4),
+        "records_per_sec": round(len(items) / best) if best > 0 else None,
+    }
+    result.update(_percentiles(samples))
+    result["cumulative_peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+def run_suite(scale: int = 100_000, seed: int = 0, repeat: int = 3) -> dict:
+    """
+    Runs every benchmark on `scale` synthetic records and returns a JSON-ready report.
+    """
+    logs = list(generate_logs(scale, seed))
+    sentences = [server_log_to_sentence(log_entry) for log_entry in logs]
+    human_context = "We've been seeing a series of failed API calls from a script, not a browser."
+
+    results = [
+        run_benchmark("server_log_to_sentence", server_log_to_sentence, logs, repeat),
+        run_benchmark("create_multimodal_prompt", lambda s: create_multimodal_prompt(s, human_context), sentences, repeat),
+        run_benchmark("translate_and_prompt",
+                      lambda log_entry: create_multimodal_prompt(server_log_to_sentence(log_entry), human_context),
+                      logs, repeat),
+    ]
+
+    started = time.perf_counter()
+    prompts = sum(1 for _ in pack_prompts(sentences, human_context))
+    elapsed = time.perf_counter() - started
+    results.append({
+        "name": "pack_prompts",
+        "records": scale,
+        "seconds": round(elapsed, 4),
+        "records_per_sec": round(scale / elapsed) if elapsed > 0 else None,
+        "prompts": prompts,
+        "cumulative_peak_rss_mb": _peak_rss_mb(),
+    })
+
+    return {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "scale": scale,
+        "seed": seed,
+        "results": results,
+    }
+
+def load_reports(path: str) -> list[dict]:
+    """
+    Every report in `path`: a single report as printed (indented) or a history file
+    written by --output, one report per line.
+    """
+    with open(path) as f:
+        text = f.read()
+    decoder = json.JSONDecoder()
+    reports, position = [], 0
+    while True:
+        while position < len(text) and text[position].isspace():
+            position += 1
+        if position == len(text):
+            return reports
+        report, position = decoder.raw_decode(text, position)
+        reports.append(report)
+
+def compare_reports(baseline: dict, current: dict, tolerance: float = 0.10) -> list[str]:
+    """
+    Lists the benchmarks whose throughput dropped by more than `tolerance` since `baseline`.
+    """
+    previous = {result["name"]: result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(result["name"], {}).get("records_per_sec")
+        after = result.get("records_per_sec")
+        if before and after and after < before * (1 - tolerance):
+            regressions.append(f"{result['name']}: {before} -> {after} records/sec ({after / before - 1:+.1%})")
+    return regressions
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the data2sentence pipeline on synthetic logs.")
+    parser.add_argument("--scale", type=int, default=100_000, help="number of synthetic records")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="append the JSON report as one line to this file")
+    parser.add_argument("--compare", help="a previous JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--write-ndjson", metavar="PATH", help="only write the synthetic log to PATH and exit")
+    args = parser.parse_args()
+
+    if args.write_ndjson:
+        write_ndjson(args.write_ndjson, args.scale, args.seed)
+        sys.exit(0)
+
+    report = run_suite(args.scale, args.seed, args.repeat)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+    if args.compare:
+        baseline = load_reports(args.compare)[-1]
+        regressions = compare_reports(baseline, report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
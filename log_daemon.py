@@ -0,0 +1,296 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+
+from openai import AsyncOpenAI
+
+from data2sentence import server_log_to_sentence, create_multimodal_prompt, timestamp_to_epoch
+
+# --- Following Rotating Log Files ---
+
+async def follow_file(path: str, poll_interval: float = 0.2, from_start: bool = False):
+    """
+    Yields (line, observed_at) for every complete line appended to `path`, forever.
+
+    Survives both styles of log rotation: when the path starts pointing at a new file
+    (rename + create) the old one is drained first and the new one is read from the
+    start, and when the file shrinks in place (copytruncate) reading restarts at 0.
+    """
+    f = None
+    identity = None
+    buffer = b""
+    while True:
+        if f is None:
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                await asyncio.sleep(poll_interval)
+                continue
+            stat = os.fstat(f.fileno())
+            identity = (stat.st_dev, stat.st_ino)
+            if not from_start:
+                f.seek(0, os.SEEK_END)
+            # Files that appear after a rotation are always read from their first line.
+            from_start = True
+
+        chunk = f.read(64 * 1024)
+        if chunk:
+            lines = (buffer + chunk).split(b"\n")
+            buffer = lines.pop()
+            observed_at = time.time()
+            for line in lines:
+                if line.strip():
+                    yield line, observed_at
+            continue
+
+        # At end of file: check whether the file was rotated or truncated.
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            stat = None
+        if stat is not None and (stat.st_dev, stat.st_ino) != identity:
+            # Lines may have landed in the old file between our last read and the rename.
+            lines = (buffer + f.read()).split(b"\n")
+            f.close()
+            f, buffer = None, b""
+            observed_at = time.time()
+            for line in lines:
+                if line.strip():
+                    yield line, observed_at
+            continue
+        if stat is not None and stat.st_size < f.tell():
+            f.seek(0)
+            buffer = b""
+            continue
+        await asyncio.sleep(poll_interval)
+
+# --- Metrics ---
+
+class PipelineMetrics:
+    """
+    Counters and end-to-end lag (log write -> verdict) for the daemon.
+    Lag percentiles are computed over the most recent `window` verdicts.
+    """
+
+    def __init__(self, window: int = 10_000):
+        self.lines_read = 0
+        self.skipped = 0
+        self.shed = 0
+        self.analyzed = 0
+        self.failed = 0
+        self.callback_errors = 0
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.lags = deque(maxlen=window)
+        self.started_at = time.time()
+
+    def snapshot(self) -> dict:
+        lags = sorted(self.lags)
+
+        def percentile(q):
+            return round(lags[min(len(lags) - 1, int(q * len(lags)))], 3) if lags else None
+
+        elapsed = time.time() - self.started_at
+        return {
+            "lines_read": self.lines_read,
+            "skipped": self.skipped,
+            "shed": self.shed,
+            "analyzed": self.analyzed,
+            "failed": self.failed,
+            "callback_errors": self.callback_errors,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "verdicts_per_sec": round(self.analyzed / elapsed, 2) if elapsed > 0 else 0.0,
+            "lag_p50_seconds": percentile(0.50),
+            "lag_p95_seconds": percentile(0.95),
+            "lag_p99_seconds": percentile(0.99),
+            "lag_max_seconds": round(lags[-1], 3) if lags else None,
+        }
+
+async def serve_metrics(metrics: PipelineMetrics, host: str = "127.0.0.1", port: int = 9108):
+    """
+    Serves the metrics snapshot as JSON on any HTTP GET, e.g. curl localhost:9108/metrics.
+    """
+    async def handle(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        body = json.dumps(metrics.snapshot()).encode()
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                     b"Content-Length: " + str(len(body)).encode() + b"\r\nConnection: close\r\n\r\n" + body)
+        await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+# --- The Async Pipeline ---
+
+def make_openai_analyzer(model: str = "gpt-4-turbo", timeout: float = 30.0, client: AsyncOpenAI | None = None):
+    """
+    Returns an async prompt -> verdict function backed by an OpenAI-compatible API.
+    Set OPENAI_BASE_URL (or pass a client) to point it at a local stand-in.
+    """
+    client = client or AsyncOpenAI(timeout=timeout)
+
+    async def analyze(prompt: str) -> str:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        return response.choices[0].message.content
+
+    return analyze
+
+class LogAnalysisDaemon:
+    """
+    Follows a log file, translates each new line into a prompt, and dispatches the
+    prompts to the LLM with at most `concurrency` requests in flight.
+
+    The queue between the tailer and the LLM workers holds at most `queue_size`
+    prompts; when it is full the tailer waits, so a slow LLM backs up into unread
+    file data instead of into memory.
+
+    Pass an `admission` controller (see log_admission) to shed load instead: records
+    it turns away are counted in metrics.shed and never reach the queue.
+    """
+
+    def __init__(self, path: str, human_context: str, analyze=None, concurrency: int = 8,
+                 queue_size: int = 1000, source: str = "default", on_verdict=None,
+                 from_start: bool = False, poll_interval: float = 0.2, admission=None):
+        self.path = path
+        self.human_context = human_context
+        self.analyze = analyze or make_openai_analyzer()
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.source = source
+        self.on_verdict = on_verdict
+        self.from_start = from_start
+        self.poll_interval = poll_interval
+        self.admission = admission
+        self.metrics = PipelineMetrics()
+
+    def translate(self, line: bytes, observed_at: float) -> dict | None:
+        """
+        Turns one raw NDJSON line into a work item, or None if it can't be parsed.
+        The log's own timestamp is used as its write time when it has one.
+        """
+        try:
+            log_entry = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(log_entry, dict):
+            return None
+        sentence = server_log_to_sentence(log_entry, self.source)
+        written_at = timestamp_to_epoch(log_entry.get("timestamp")) or observed_at
+        return {
+            "log": log_entry,
+            "sentence": sentence,
+            "prompt": create_multimodal_prompt(sentence, self.human_context),
+            "written_at": min(written_at, observed_at),
+        }
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            self.metrics.queue_depth = queue.qsize()
+            self.metrics.in_flight += 1
+            try:
+                verdict = await self.analyze(item["prompt"])
+            except Exception as e:
+                self.metrics.failed += 1
+                print(f"  -> ERROR: LLM analysis failed: {e}")
+                continue
+            else:
+                lag = time.time() - item["written_at"]
+                self.metrics.analyzed += 1
+                self.metrics.lags.append(lag)
+                if self.on_verdict is not None:
+                    # A failing callback must not take the worker (and its share of
+                    # the concurrency) down with it.
+                    try:
+                        self.on_verdict(item, verdict, lag)
+                    except Exception as e:
+                        self.metrics.callback_errors += 1
+                        print(f"  -> ERROR: on_verdict failed: {e}")
+            finally:
+                self.metrics.in_flight -= 1
+                queue.task_done()
+
+    async def run(self):
+        """
+        Runs until cancelled.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        try:
+            async for line, observed_at in follow_file(self.path, self.poll_interval, self.from_start):
+                self.metrics.lines_read += 1
+                item = self.translate(line, observed_at)
+                if item is None:
+                    self.metrics.skipped += 1
+                    continue
+                if self.admission is not None:
+                    admitted, item["represents"] = self.admission.offer(item["log"], queue.qsize())
+                    if not admitted:
+                        self.metrics.shed += 1
+                        continue
+                await queue.put(item)
+                self.metrics.queue_depth = queue.qsize()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    human_context = "We've been seeing a series of failed API calls from a script, not a browser."
+
+    if len(sys.argv) > 1:
+        # Daemon mode: python log_daemon.py /var/log/app/access.ndjson [concurrency]
+        concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+        async def main():
+            daemon = LogAnalysisDaemon(sys.argv[1], human_context, concurrency=concurrency,
+                                       on_verdict=lambda item, verdict, lag: print(f"[{lag:.2f}s] {item['sentence']} -> {verdict}"))
+            await serve_metrics(daemon.metrics)
+            await daemon.run()
+
+        asyncio.run(main())
+    else:
+        # Demo: a local stand-in plays the LLM while we append to (and rotate) a log file.
+        import tempfile
+        from llm_standin import start_standin_server
+
+        server, base_url = start_standin_server(delay=0.2)
+        log_path = os.path.join(tempfile.mkdtemp(), "access.ndjson")
+        open(log_path, "w").close()
+
+        async def write_logs():
+            for i in range(200):
+                if i == 100:
+                    os.rename(log_path, log_path + ".1")
+                with open(log_path, "a") as f:
+                    f.write(json.dumps({
+                        "timestamp": time.time(),
+                        "method": "GET",
+                        "path": "/api/v1/user/settings",
+                        "status": 403,
+                        "latency_ms": 150,
+                        "user_agent": "Python-requests/2.25.1",
+                    }) + "\n")
+                await asyncio.sleep(0.005)
+
+        async def demo():
+            client = AsyncOpenAI(base_url=base_url, api_key="standin")
+            daemon = LogAnalysisDaemon(log_path, human_context, make_openai_analyzer(client=client),
+                                       concurrency=16, queue_size=50, poll_interval=0.05, from_start=True)
+            task = asyncio.create_task(daemon.run())
+            await write_logs()
+            while daemon.metrics.analyzed + daemon.metrics.failed < 200:
+                await asyncio.sleep(0.1)
+            task.cancel()
+            print(json.dumps(daemon.metrics.snapshot(), indent=2))
+
+        asyncio.run(demo())
+        server.shutdown()
@@ -0,0 +1,173 @@
+import json
+import mmap
+import os
+import sys
+from array import array
+from typing import Iterable
+
+from data2sentence import translate_ndjson_file
+
+# A dataset "prefix" is three files:
+#   <prefix>.bin   every example's tokens back to back, as fixed-width unsigned ints
+#   <prefix>.idx   n + 1 uint64 token offsets; example i is tokens[idx[i]:idx[i + 1]]
+#   <prefix>.json  metadata (token width, example and token counts, tokenizer name)
+# Both binary files are in native byte order and are read back through mmap without copying.
+TOKEN_TYPECODES = {"uint8": "B", "uint16": "H", "uint32": "I"}
+
+def byte_tokenize(text: str) -> bytes:
+    """
+    The default tokenizer: raw UTF-8 bytes (vocabulary of 256). Any callable that maps
+    text to a sequence of ints can be used instead, e.g. a tiktoken encoding's encode.
+    """
+    return text.encode("utf-8")
+
+class TokenDatasetWriter:
+    """
+    Streams tokenized examples into a flat token file plus an offsets index.
+    Tokens are buffered and written in large blocks, so memory use is independent of
+    the dataset size.
+    """
+
+    def __init__(self, prefix: str, dtype: str = "uint16", tokenizer_name: str = "byte", buffer_tokens: int = 1 << 20):
+        if dtype not in TOKEN_TYPECODES:
+            raise ValueError(f"dtype must be one of {sorted(TOKEN_TYPECODES)}, got {dtype!r}")
+        self.prefix = prefix
+        self.dtype = dtype
+        self.tokenizer_name = tokenizer_name
+        self.buffer_tokens = buffer_tokens
+        self._tokens = open(prefix + ".bin", "wb")
+        self._index = open(prefix + ".idx", "wb")
+        self._token_buffer = array(TOKEN_TYPECODES[dtype])
+        self._offset_buffer = array("Q", [0])
+        self.examples = 0
+        self.total_tokens = 0
+
+    def add(self, tokens):
+        """
+        Appends one example. Raises OverflowError if a token doesn't fit the dtype, in
+        which case nothing of the example is kept.
+        """
+        # Convert into a scratch array first (not array(typecode, tokens), which would
+        # reinterpret a bytes example as raw memory), so a bad token can't leave part
+        # of the example in the buffer.
+        example = array(self._token_buffer.typecode)
+        example.extend(tokens)
+        self._token_buffer.extend(example)
+        self.total_tokens += len(example)
+        self.examples += 1
+        self._offset_buffer.append(self.total_tokens)
+        if len(self._token_buffer) >= self.buffer_tokens:
+            self._flush()
+
+    def _flush(self):
+        self._token_buffer.tofile(self._tokens)
+        self._offset_buffer.tofile(self._index)
+        del self._token_buffer[:]
+        del self._offset_buffer[:]
+
+    def close(self) -> dict:
+        self._flush()
+        self._tokens.close()
+        self._index.close()
+        metadata = {
+            "dtype": self.dtype,
+            "byteorder": sys.byteorder,
+            "examples": self.examples,
+            "tokens": self.total_tokens,
+            "tokenizer": self.tokenizer_name,
+        }
+        with open(self.prefix + ".json", "w") as f:
+            json.dump(metadata, f, indent=2)
+        return metadata
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def export_sentences(sentences: Iterable[str], prefix: str, tokenize=byte_tokenize, dtype: str = "uint16",
+                     tokenizer_name: str | None = None) -> dict:
+    """
+    Tokenizes every sentence and writes it as one example. Returns the dataset metadata.
+    """
+    writer = TokenDatasetWriter(prefix, dtype, tokenizer_name or getattr(tokenize, "__name__", "custom"))
+    with writer:
+        for sentence in sentences:
+            writer.add(tokenize(sentence))
+    with open(prefix + ".json") as f:
+        return json.load(f)
+
+def export_ndjson(path: str, prefix: str, tokenize=byte_tokenize, dtype: str = "uint16",
+                  source: str = "default", workers: int | None = None) -> dict:
+    """
+    Translates an NDJSON log with the bulk mode of data2sentence and exports the
+    log sentences as a token dataset.
+    """
+    return export_sentences(translate_ndjson_file(path, workers, source=source), prefix, tokenize, dtype)
+
+class TokenDataset:
+    """
+    Random access to an exported dataset. dataset[i] is a zero-copy memoryview of
+    example i's tokens, straight out of the page cache.
+    """
+
+    def __init__(self, prefix: str):
+        with open(prefix + ".json") as f:
+            self.metadata = json.load(f)
+        if self.metadata["byteorder"] != sys.byteorder:
+            raise ValueError(f"{prefix} was written on a {self.metadata['byteorder']}-endian machine")
+        self._maps = []
+        self._views = []
+        self.tokens = self._map(prefix + ".bin").cast(TOKEN_TYPECODES[self.metadata["dtype"]])
+        self.offsets = self._map(prefix + ".idx").cast("Q")
+
+    def _map(self, path: str) -> memoryview:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        view = memoryview(mapped)
+        self._views.append(view)
+        return view
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> memoryview:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.tokens[self.offsets[i]:self.offsets[i + 1]]
+
+    def close(self):
+        """
+        Unmaps the files. Any example views still held by the caller must be released first.
+        """
+        for view in [self.tokens, self.offsets] + self._views:
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    # Export: python log_dataset.py access.ndjson out/train
+    if len(sys.argv) > 2:
+        print(json.dumps(export_ndjson(sys.argv[1], sys.argv[2]), indent=2))
+    else:
+        import tempfile
+        from data2sentence import server_log_to_sentence
+
+        prefix = os.path.join(tempfile.mkdtemp(), "sentences")
+        sentences = [server_log_to_sentence({"method": "GET", "path": f"/api/v1/orders/{i}", "status": 200,
+                                             "latency_ms": i % 300}) for i in range(10_000)]
+        print(json.dumps(export_sentences(sentences, prefix), indent=2))
+
+        dataset = TokenDataset(prefix)
+        example = dataset[1234]
+        print(f"{len(dataset)} examples; example 1234 has {len(example)} tokens:")
+        print(bytes(example.tolist()).decode("utf-8"))
+        example.release()
+        dataset.close()
@@ -0,0 +1,182 @@
+import re
+import sys
+import time
+from operator import itemgetter
+from typing import Iterable, Iterator
+
+from data2sentence import get_grammar, server_log_to_sentence
+
+# The fields of the nginx/Apache "combined" format in line order, plus an optional
+# trailing latency field ($request_time in nginx, %D in Apache):
+# 127.0.0.1 - frank [10/Oct/2000:13:55:36 -0700] "GET /a.gif HTTP/1.0" 200 2326 "http://ref/" "Mozilla/4.08" 0.150
+# `request_time` is that field as logged and `latency_ms` the same value in milliseconds.
+# It is only taken when it is a plain number, so a line with further fields instead
+# (e.g. a quoted X-Forwarded-For) still parses, with no latency.
+COMBINED_FIELDS = ("remote_addr", "method", "path", "protocol", "status", "bytes_sent", "referer", "user_agent",
+                   "request_time")
+
+# Grammar keys that are just other names for combined-format fields.
+FIELD_ALIASES = {
+    "request_method": "method",
+    "request_uri": "path",
+    "http_user_agent": "user_agent",
+    "http_referer": "referer",
+    "body_bytes_sent": "bytes_sent",
+    "latency_ms": "request_time",
+}
+
+# Multipliers that turn the trailing latency field into milliseconds.
+LATENCY_UNITS = {"s": 1000.0, "ms": 1.0, "us": 0.001}
+
+_QUOTED = r'(?:[^"\\]|\\.)*'
+_NUMBER = r"(?:\d+(?:\.\d*)?|\.\d+)(?=\s|$)"
+
+def combined_pattern(fields: set[str]) -> re.Pattern:
+    """
+    Builds a combined-format pattern that captures only `fields`, in line order.
+    Everything else, including the timestamp, is matched but never extracted, and a
+    "-" placeholder makes its group None instead of a string.
+    """
+    def field(name, capture, skip):
+        return capture if name in fields else skip
+
+    return re.compile(
+        field("remote_addr", r"(\S+)", r"\S+")
+        + r' \S+ \S+ \[[^\]]*\] "'
+        + field("method", r"(\S+)", r"\S+") + " "
+        + field("path", r"(\S+)", r"\S+")
+        + field("protocol", r'(?: ([^"]*))?', r'[^"]*') + '" '
+        + field("status", r"(\d{3})", r"\d{3}") + " "
+        + field("bytes_sent", r"(?:-|(\d+))", r"\S+")
+        + ' "' + field("referer", f"(?:-|({_QUOTED}))", _QUOTED) + '"'
+        + ' "' + field("user_agent", f"(?:-|({_QUOTED}))", _QUOTED) + '"'
+        + field("request_time", rf"(?: (?:-|({_NUMBER})))?", "")
+    )
+
+def iter_combined_rows(lines: Iterable[bytes], keys: list[str], latency_unit: str = "s",
+                       stats: dict | None = None) -> Iterator[tuple]:
+    """
+    Parses combined-format lines straight into rows (sequences) of the requested `keys`.
+
+    A pattern specialised to those keys captures only what the grammar uses: the
+    timestamp and unused fields are skipped without being extracted or converted, and
+    no dictionary is built. Keys that the format doesn't carry come back as None, as
+    does any "-" field. Lines that don't parse are skipped and counted in
+    stats["skipped"].
+    """
+    fields = [FIELD_ALIASES.get(key, key) for key in keys]
+    captured = [name for name in COMBINED_FIELDS if name in fields]
+    match = combined_pattern(set(captured)).match
+    # Reorders the captured groups (plus a trailing None for unknown keys) into key order.
+    select = itemgetter(*[captured.index(name) if name in captured else len(captured) for name in fields])
+    single = len(keys) == 1
+    latency_slots = [i for i, key in enumerate(keys) if key == "latency_ms"]
+    scale = LATENCY_UNITS[latency_unit]
+    missing = (None,)
+    skipped = 0
+
+    for line in lines:
+        found = match(line.decode("utf-8", "replace"))
+        if found is None:
+            skipped += 1
+            continue
+        row = select(found.groups() + missing)
+        if single:
+            row = (row,)
+        if latency_slots:
+            row = list(row)
+            for i in latency_slots:
+                if row[i] is not None:
+                    row[i] = round(float(row[i]) * scale)
+        yield row
+
+    if stats is not None:
+        stats["skipped"] = stats.get("skipped", 0) + skipped
+
+def translate_access_log(path: str, source: str = "default", latency_unit: str = "s",
+                         stats: dict | None = None) -> Iterator[str]:
+    """
+    Streams the log sentences for every line of a combined-format access log,
+    feeding parsed rows straight into the grammar's compiled row formatter.
+    """
+    grammar = get_grammar(source)
+    format_row = grammar.format_row
+    with open(path, "rb") as f:
+        for row in iter_combined_rows(f, grammar.keys, latency_unit, stats):
+            yield format_row(row)
+
+# --- Baseline: regex into a dict, then the dict translator ---
+
+COMBINED_PATTERN = re.compile(
+    r'(?P<remote_addr>\S+) \S+ \S+ \[(?P<time_local>[^\]]*)\] "(?P<method>\S+) (?P<path>\S+)(?: (?P<protocol>[^"]*))?" '
+    r'(?P<status>\d{3}) (?P<bytes_sent>\S+) "(?P<referer>[^"]*)" "(?P<user_agent>[^"]*)"'
+    rf'(?: (?P<request_time>-|{_NUMBER}))?'
+)
+
+def regex_access_log_to_dict(line: str, parse_time: bool = True) -> dict | None:
+    """
+    The conventional approach: a regex into a dict with a parsed timestamp and
+    typed fields, for comparison with iter_combined_rows. A "-" field is missing
+    (None), as there. With `parse_time=False` the timestamp is left as text, which
+    the sentence doesn't use anyway.
+    """
+    match = COMBINED_PATTERN.match(line)
+    if match is None:
+        return None
+    log_entry = {key: None if value == "-" else value for key, value in match.groupdict().items()}
+    time_local = log_entry.pop("time_local")
+    if parse_time:
+        log_entry["timestamp"] = time.strptime(time_local, "%d/%b/%Y:%H:%M:%S %z")
+    log_entry["status"] = int(log_entry["status"])
+    if log_entry["request_time"] is not None:
+        log_entry["latency_ms"] = round(float(log_entry["request_time"]) * 1000)
+    return log_entry
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    # python log_parser.py access.log  -> prints the measured speedup over regex-then-dict
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            lines = f.read().splitlines()
+    else:
+        samples = [
+            b'203.0.113.9 - - [26/Oct/2025:10:00:05 +0000] "GET /api/v1/user/settings HTTP/1.1" 403 153 '
+            b'"-" "Python-requests/2.25.1" 0.150',
+            b'198.51.100.4 - - [26/Oct/2025:10:00:06 +0000] "POST /api/v1/orders HTTP/1.1" 201 - '
+            b'"https://shop.example/cart" "-" -',
+            b'192.0.2.77 - - [26/Oct/2025:10:00:07 +0000] "GET /health HTTP/1.1" 200 2 "-" "curl/8.5.0"',
+            b'203.0.113.9 - - [26/Oct/2025:10:00:08 +0000] "GET /api/v1/user HTTP/1.1" 200 88 '
+            b'"-" "Mozilla/5.0" 0.004 "10.0.0.1, 10.0.0.2"',
+        ]
+        lines = samples * 50_000
+
+    # Parity first, on lines with "-" fields and a trailing extra field: both paths
+    # must drop the same fields, or the speedup compares different work.
+    format_row = get_grammar("default").format_row
+    for line in dict.fromkeys(lines[:1000]):
+        expected = server_log_to_sentence(regex_access_log_to_dict(line.decode("utf-8", "replace")))
+        actual = [format_row(row) for row in iter_combined_rows([line], get_grammar("default").keys)]
+        if actual != [expected]:
+            sys.exit(f"parity check failed on {line!r}:\n  regex:  {expected}\n  direct: {actual}")
+
+    started = time.perf_counter()
+    baseline = [server_log_to_sentence(regex_access_log_to_dict(line.decode("utf-8", "replace"))) for line in lines]
+    regex_seconds = time.perf_counter() - started
+
+    # The same regex path without strptime, so the speedup isn't just the skipped timestamp.
+    started = time.perf_counter()
+    untimed = [server_log_to_sentence(regex_access_log_to_dict(line.decode("utf-8", "replace"), parse_time=False))
+               for line in lines]
+    untimed_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    direct = [format_row(row) for row in iter_combined_rows(lines, get_grammar("default").keys)]
+    direct_seconds = time.perf_counter() - started
+
+    print(f"--- {len(lines)} lines ---")
+    print(f"regex -> dict -> sentence:               {len(lines) / regex_seconds:,.0f} lines/sec")
+    print(f"regex -> dict (no strptime) -> sentence: {len(lines) / untimed_seconds:,.0f} lines/sec")
+    print(f"direct parser -> sentence:               {len(lines) / direct_seconds:,.0f} lines/sec")
+    print(f"speedup: {regex_seconds / direct_seconds:.1f}x, {untimed_seconds / direct_seconds:.1f}x without strptime; "
+          f"identical output: {baseline == direct == untimed}")
+    print("\n".join(dict.fromkeys(direct[:1000])))
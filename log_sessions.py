@@ -0,0 +1,176 @@
+import math
+import time
+from collections import OrderedDict
+
+from data2sentence import create_multimodal_prompt, timestamp_to_epoch
+
+# The fields that identify a client. Records missing all of them share one anonymous session.
+DEFAULT_CLIENT_FIELDS = ("remote_addr", "user_agent", "token")
+
+class Session:
+    """
+    The compact running summary of one client session. Only a bounded number of
+    distinct paths are counted individually; the rest are folded into `other_paths`.
+    """
+
+    __slots__ = ("client", "first_seen", "last_seen", "requests", "statuses", "methods", "paths",
+                 "other_paths", "latency_total", "latency_count", "latency_max")
+
+    def __init__(self, client: tuple, timestamp: float):
+        self.client = client
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.requests = 0
+        self.statuses = {}
+        self.methods = {}
+        self.paths = {}
+        self.other_paths = 0
+        self.latency_total = 0.0
+        self.latency_count = 0
+        self.latency_max = 0.0
+
+class SessionTracker:
+    """
+    Groups records into per-client sessions that end after `inactivity_timeout`
+    seconds without a request.
+
+    Sessions are kept in least-recently-active order, so idle ones are found and
+    evicted from the front without scanning. At most `max_sessions` are held at once;
+    beyond that the least recently active session is closed early. Closed sessions are
+    returned to the caller, ready for session_to_sentence.
+    """
+
+    def __init__(self, inactivity_timeout: float = 1800.0, max_sessions: int = 1_000_000,
+                 client_fields: tuple = DEFAULT_CLIENT_FIELDS, max_paths_per_session: int = 8):
+        self.inactivity_timeout = inactivity_timeout
+        self.max_sessions = max_sessions
+        self.client_fields = client_fields
+        self.max_paths_per_session = max_paths_per_session
+        self.sessions = OrderedDict()
+        self.closed_count = 0
+
+    def add(self, log_entry: dict, now: float | None = None) -> list[Session]:
+        """
+        Adds one record to its client's session. Returns the sessions that went idle
+        as of this record's timestamp (or were evicted to stay within max_sessions).
+        """
+        if now is None:
+            now = timestamp_to_epoch(log_entry.get("timestamp"))
+        if now is None:
+            now = time.time()
+        closed = self.expire(now)
+
+        client = tuple(log_entry.get(field) for field in self.client_fields)
+        session = self.sessions.get(client)
+        if session is not None and now - session.last_seen > self.inactivity_timeout:
+            # Out-of-order input can leave an expired session behind; close it here.
+            closed.append(self.sessions.pop(client))
+            session = None
+        if session is None:
+            if len(self.sessions) >= self.max_sessions:
+                closed.append(self.sessions.popitem(last=False)[1])
+            session = self.sessions[client] = Session(client, now)
+        else:
+            self.sessions.move_to_end(client)
+
+        session.requests += 1
+        session.first_seen = min(session.first_seen, now)
+        session.last_seen = max(session.last_seen, now)
+        status = log_entry.get("status")
+        if status is not None:
+            status_class = f"{str(status)[:1]}XX"
+            session.statuses[status_class] = session.statuses.get(status_class, 0) + 1
+        method = log_entry.get("method")
+        if method is not None:
+            session.methods[method] = session.methods.get(method, 0) + 1
+        path = log_entry.get("path")
+        if path is not None:
+            if path in session.paths:
+                session.paths[path] += 1
+            elif len(session.paths) < self.max_paths_per_session:
+                session.paths[path] = 1
+            else:
+                session.other_paths += 1
+        # A latency that isn't a finite number (e.g. "-") counts as missing.
+        try:
+            latency = float(log_entry["latency_ms"])
+        except (KeyError, TypeError, ValueError):
+            latency = None
+        if latency is not None and math.isfinite(latency):
+            session.latency_total += latency
+            session.latency_count += 1
+            session.latency_max = max(session.latency_max, latency)
+
+        self.closed_count += len(closed)
+        return closed
+
+    def expire(self, now: float) -> list[Session]:
+        """
+        Closes every session idle for longer than the inactivity timeout.
+        """
+        closed = []
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if now - session.last_seen <= self.inactivity_timeout:
+                break
+            closed.append(self.sessions.popitem(last=False)[1])
+        return closed
+
+    def flush(self) -> list[Session]:
+        """
+        Closes all open sessions, e.g. at shutdown.
+        """
+        closed = list(self.sessions.values())
+        self.sessions.clear()
+        self.closed_count += len(closed)
+        return closed
+
+def _counts(counts: dict) -> str:
+    return ",".join(f"{key}:{count}" for key, count in sorted(counts.items(), key=lambda item: -item[1]))
+
+def session_to_sentence(session: Session, client_fields: tuple = DEFAULT_CLIENT_FIELDS) -> str:
+    """
+    Compresses a whole session into one "session sentence" for create_multimodal_prompt.
+    """
+    duration = session.last_seen - session.first_seen
+    parts = [f"SESSION_REQUESTS_{session.requests}", f"DURATION_S_{duration:.0f}"]
+    if duration > 0:
+        parts.append(f"RATE_PER_MIN_{session.requests / duration * 60:.1f}")
+    for field, value in zip(client_fields, session.client):
+        if value is not None:
+            parts.append(f"{field.upper()}_{value}")
+    if session.statuses:
+        parts.append(f"STATUSES_{_counts(session.statuses)}")
+    if session.methods:
+        parts.append(f"METHODS_{_counts(session.methods)}")
+    if session.paths:
+        parts.append(f"PATHS_{_counts(session.paths)}")
+    if session.other_paths:
+        parts.append(f"OTHER_PATH_REQUESTS_{session.other_paths}")
+    if session.latency_count:
+        parts.append(f"LATENCY_MS_AVG_{session.latency_total / session.latency_count:.0f}")
+        parts.append(f"LATENCY_MS_MAX_{session.latency_max:.0f}")
+    return " ".join(parts)
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    tracker = SessionTracker(inactivity_timeout=300)
+    start = 1761472800.0
+    closed = []
+
+    # A browser user clicking around for a few minutes...
+    for i, path in enumerate(["/", "/login", "/api/v1/user/settings", "/api/v1/orders", "/"]):
+        closed += tracker.add({"timestamp": start + i * 40, "remote_addr": "198.51.100.7", "method": "GET",
+                               "path": path, "status": 200, "latency_ms": 90,
+                               "user_agent": "Mozilla/5.0 (Macintosh)"})
+    # ...while a script hammers the settings endpoint twice a second.
+    for i in range(600):
+        closed += tracker.add({"timestamp": start + i * 0.5, "remote_addr": "203.0.113.9", "method": "GET",
+                               "path": "/api/v1/user/settings", "status": 403, "latency_ms": 150,
+                               "user_agent": "Python-requests/2.25.1"})
+    closed += tracker.flush()
+
+    print(f"--- 605 requests -> {len(closed)} session sentences ---")
+    human_context = "We've been seeing a series of failed API calls from a script, not a browser."
+    for session in closed:
+        print(create_multimodal_prompt(session_to_sentence(session), human_context))
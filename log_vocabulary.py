@@ -0,0 +1,168 @@
+from collections import Counter
+from typing import Iterable
+
+from data2sentence import estimate_tokens, pack_prompts, server_log_to_sentence
+
+# Latency ranges in milliseconds; each record only carries the bucket code.
+DEFAULT_LATENCY_BUCKETS = [50, 200, 1000, 5000]
+
+STATUS_CLASSES = {
+    "1": "informational",
+    "2": "success",
+    "3": "redirect",
+    "4": "client error",
+    "5": "server error",
+}
+
+class LogVocabulary:
+    """
+    A shared vocabulary for compact, token-efficient log records.
+
+    Frequent paths and user agents get short codes (P1, U1, ...) that are spelled out
+    once in a legend at the top of the prompt, and latencies are bucketed into ranges
+    (L0, L1, ...). Each record then reads like "403 GET P1 L1 U1".
+    """
+
+    def __init__(self, paths: list[str] | None = None, user_agents: list[str] | None = None,
+                 latency_buckets: list[float] | None = None):
+        self.paths = {path: f"P{i}" for i, path in enumerate(paths or [], start=1)}
+        self.user_agents = {agent: f"U{i}" for i, agent in enumerate(user_agents or [], start=1)}
+        self.latency_buckets = sorted(latency_buckets or DEFAULT_LATENCY_BUCKETS)
+
+    @classmethod
+    def learn(cls, log_entries: Iterable[dict], max_paths: int = 50, max_user_agents: int = 20,
+              min_count: int = 2, latency_buckets: list[float] | None = None) -> "LogVocabulary":
+        """
+        Builds a vocabulary from a sample of logs. Only values that repeat at least
+        `min_count` times and are longer than their code are worth an entry.
+        """
+        paths = Counter()
+        user_agents = Counter()
+        for log_entry in log_entries:
+            if log_entry.get("path") is not None:
+                paths[str(log_entry["path"])] += 1
+            if log_entry.get("user_agent") is not None:
+                user_agents[str(log_entry["user_agent"])] += 1
+
+        def frequent(counter, limit):
+            return [value for value, count in counter.most_common(limit) if count >= min_count and len(value) > 3]
+
+        return cls(frequent(paths, max_paths), frequent(user_agents, max_user_agents), latency_buckets)
+
+    def latency_code(self, latency_ms) -> str | None:
+        """The latency's bucket code, or None when it isn't a number (e.g. "-")."""
+        try:
+            latency_ms = float(latency_ms)
+        except (TypeError, ValueError):
+            return None
+        if latency_ms != latency_ms:  # NaN
+            return None
+        for i, bound in enumerate(self.latency_buckets):
+            if latency_ms < bound:
+                return f"L{i}"
+        return f"L{len(self.latency_buckets)}"
+
+    def encode(self, log_entry: dict) -> str:
+        """
+        Encodes one log as a compact record: status method path latency user_agent,
+        with "-" for a missing field (or a latency that isn't a number). Values outside
+        the vocabulary are kept verbatim.
+        """
+        status = log_entry.get("status")
+        method = log_entry.get("method")
+        path = log_entry.get("path")
+        latency = log_entry.get("latency_ms")
+        agent = log_entry.get("user_agent")
+        return " ".join([
+            "-" if status is None else str(status),
+            "-" if method is None else str(method),
+            "-" if path is None else self.paths.get(str(path), str(path)),
+            self.latency_code(latency) or "-",
+            "-" if agent is None else self.user_agents.get(str(agent), f'"{agent}"'),
+        ])
+
+    def legend(self, records: list[str] | None = None) -> str:
+        """
+        The legend for the prompt. When the encoded records are given, only the codes
+        that actually appear in them are listed.
+        """
+        used = None
+        if records is not None:
+            used = {token for record in records for token in record.split()}
+
+        lines = ["    Each record: STATUS METHOD PATH LATENCY USER_AGENT ('-' = missing)."]
+        if used is None:
+            statuses = sorted(STATUS_CLASSES)
+        else:
+            statuses = sorted({token[0] for token in used if len(token) == 3 and token.isdigit()})
+        lines.append("    Status classes: " + ", ".join(f"{c}xx = {STATUS_CLASSES[c]}" for c in statuses if c in STATUS_CLASSES))
+
+        bounds = [0] + self.latency_buckets
+        for i, low in enumerate(bounds):
+            code = f"L{i}"
+            if used is None or code in used:
+                label = f"{low:g}-{bounds[i + 1]:g}ms" if i + 1 < len(bounds) else f"{low:g}ms+"
+                lines.append(f"    {code} = latency {label}")
+        for table in (self.paths, self.user_agents):
+            for value, code in table.items():
+                if used is None or code in used:
+                    lines.append(f"    {code} = {value}")
+        return "\n".join(lines)
+
+def pack_compact_prompts(log_entries: list[dict], human_context: str, vocabulary: LogVocabulary,
+                         token_budget: int = 4000, count_tokens=estimate_tokens, **kwargs):
+    """
+    Like data2sentence.pack_prompts, but with compact records and one shared legend
+    (restricted to the codes these entries use) on every prompt.
+    """
+    records = [vocabulary.encode(log_entry) for log_entry in log_entries]
+    legend = vocabulary.legend(records)
+    return pack_prompts(records, human_context, token_budget=token_budget,
+                        count_tokens=count_tokens, legend=legend, **kwargs)
+
+def compare_token_counts(log_entries: list[dict], human_context: str, vocabulary: LogVocabulary,
+                         token_budget: int = 4000, count_tokens=estimate_tokens) -> dict:
+    """
+    Reports the token cost of the same records as plain log sentences and as compact
+    records, and how many records fit in one prompt of `token_budget` tokens either way.
+    """
+    sentences = [server_log_to_sentence(log_entry) for log_entry in log_entries]
+    records = [vocabulary.encode(log_entry) for log_entry in log_entries]
+    legend = vocabulary.legend(records)
+
+    plain_prompts = list(pack_prompts(sentences, human_context, token_budget, count_tokens=count_tokens))
+    compact_prompts = list(pack_prompts(records, human_context, token_budget, count_tokens=count_tokens,
+                                        legend=legend))
+    return {
+        "records": len(log_entries),
+        "record_tokens_plain": sum(map(count_tokens, sentences)),
+        "record_tokens_compact": sum(map(count_tokens, records)),
+        "legend_tokens": count_tokens(legend),
+        "prompt_tokens_plain": sum(count_tokens(prompt) for _, prompt in plain_prompts),
+        "prompt_tokens_compact": sum(count_tokens(prompt) for _, prompt in compact_prompts),
+        "prompts_plain": len(plain_prompts),
+        "prompts_compact": len(compact_prompts),
+        "records_per_prompt_plain": len(log_entries) / max(1, len(plain_prompts)),
+        "records_per_prompt_compact": len(log_entries) / max(1, len(compact_prompts)),
+    }
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    import json
+
+    sample = []
+    for i in range(400):
+        sample.append({
+            "method": "GET" if i % 3 else "POST",
+            "path": ["/api/v1/user/settings", "/api/v1/orders/checkout", "/static/js/app.bundle.js"][i % 3],
+            "status": [200, 403, 200, 500][i % 4],
+            "latency_ms": (i * 37) % 1500,
+            "user_agent": ["Python-requests/2.25.1", "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"][i % 2],
+        })
+
+    vocabulary = LogVocabulary.learn(sample)
+    human_context = "We've been seeing a series of failed API calls from a script, not a browser."
+    print(json.dumps(compare_token_counts(sample, human_context, vocabulary), indent=2))
+
+    _, prompt = next(iter(pack_compact_prompts(sample[:5], human_context, vocabulary)))
+    print(prompt)
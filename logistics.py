@@ -1,12 +1,37 @@
 import os
+import sys
 import json
 import time
-from openai import OpenAI  # Using OpenAI for this example, but any powerful LLM works
+import asyncio
+from openai import OpenAI, AsyncOpenAI  # Using OpenAI for this example, but any powerful LLM works
+
+from logistics_policy import PolicyEngine, approve_or_escalate
+from logistics_schema import ProposalValidator
 
 # --- Configuration ---
 # Make sure you have your OPENAI_API_KEY set as an environment variable
 client = OpenAI()
 
+MODEL = "gpt-4-turbo"
+RESPONSE_FORMAT = {"type": "json_object"}
+
+# In a real app, this would be a more complex system prompt
+SYSTEM_PROMPT = (
+    "You are an expert logistics analyst. Your job is to analyze a shipping disruption "
+    "and propose three distinct, actionable solutions. For each solution, you must provide a name, a strategy, "
+    "an estimated cost impact, an ETA impact in hours, and a brief risk assessment. "
+    "Your entire response MUST be a single, valid JSON object with a key 'options' containing a list of these three solutions."
+)
+
+# Checks every response before a human sees it, repairing what it can locally.
+VALIDATOR = ProposalValidator()
+
+def proposal_messages(situation: str) -> list[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": situation}
+    ]
+
 # --- The Core HITL Workflow ---
 
 class HumanInTheLoop:
@@ -26,76 +51,381 @@ class HumanInTheLoop:
             return None
 
         for i, option in enumerate(proposals["options"]):
-            print(f"\n--- OPTION {i+1}: {option['name']} ---")
-            print(f"  - Strategy: {option['strategy']}")
-            print(f"  - Estimated Cost Impact: ${option['cost_impact']:,}")
-            print(f"  - Estimated ETA Impact: {option['eta_impact_hours']} hours")
-            print(f"  - Risk Assessment: {option['risk']}")
+            self.show_option(i, option)
+
+        return self.ask_for_choice(proposals["options"])
+
+    def get_human_validation_streaming(self, option_stream) -> str | None:
+        """
+        Like get_human_validation, but shows each option the moment it arrives from
+        stream_proposals instead of waiting for the whole response.
+        """
+        print("\n" + "="*50)
+        print("👤 HUMAN-IN-THE-LOOP VALIDATION REQUIRED 👤")
+        print("="*50)
+        print("\nThe AI is analyzing the situation; options appear as they are generated:")
+
+        options = []
+        for option in option_stream:
+            self.show_option(len(options), option)
+            options.append(option)
+
+        if not options:
+            print("  -> AI failed to generate valid proposals.")
+            return None
+        return self.ask_for_choice(options)
+
+    def show_option(self, i: int, option: dict):
+        print(f"\n--- OPTION {i+1}: {option['name']} ---", flush=True)
+        print(f"  - Strategy: {option['strategy']}")
+        print(f"  - Estimated Cost Impact: ${option['cost_impact']:,}")
+        print(f"  - Estimated ETA Impact: {option['eta_impact_hours']} hours")
+        print(f"  - Risk Assessment: {option['risk']}", flush=True)
 
+    def ask_for_choice(self, options: list[dict]) -> str:
         print("\n" + "-"*50)
         
         while True:
             try:
-                choice = input(f"Please approve an option by number (1-{len(proposals['options'])}) or type 'reject' to abort: ")
+                choice = input(f"Please approve an option by number (1-{len(options)}) or type 'reject' to abort: ")
                 if choice.lower() == 'reject':
                     return "REJECTED"
                 
                 choice_index = int(choice) - 1
-                if 0 <= choice_index < len(proposals["options"]):
-                    return proposals["options"][choice_index]["name"]
+                if 0 <= choice_index < len(options):
+                    return options[choice_index]["name"]
                 else:
                     print("Invalid selection. Please try again.")
             except ValueError:
                 print("Invalid input. Please enter a number.")
 
-def ai_logistics_analyst(situation: str) -> dict:
+def ai_logistics_analyst(situation: str, cache=None, resilience=None) -> dict:
     """
     An AI agent that analyzes a logistics problem and proposes solutions.
+    With a logistics_cache.ProposalCache, repeat situations skip the LLM entirely.
+    With an llm_resilience.ResilientCaller, the call gets deadlines, retries, a circuit
+    breaker and optional hedging instead of failing on the first slow or lost request.
     """
     print("\n" + "="*50)
     print("🤖 AI LOGISTICS ANALYST ACTIVATED 🤖")
     print("="*50)
     print(f"Analyzing situation: {situation}")
-    
-    # In a real app, this would be a more complex system prompt
-    system_prompt = (
-        "You are an expert logistics analyst. Your job is to analyze a shipping disruption "
-        "and propose three distinct, actionable solutions. For each solution, you must provide a name, a strategy, "
-        "an estimated cost impact, an ETA impact in hours, and a brief risk assessment. "
-        "Your entire response MUST be a single, valid JSON object with a key 'options' containing a list of these three solutions."
-    )
+
+    if cache is not None:
+        key = cache.make_key(situation, SYSTEM_PROMPT, MODEL, RESPONSE_FORMAT)
+        proposals = cache.get(key)
+        if proposals is not None:
+            print("  -> Proposals served from cache.")
+            return proposals
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": situation}
-            ]
+        if resilience is not None:
+            response = asyncio.run(_resilient_completion_once(situation, resilience))
+        else:
+            response = client.chat.completions.create(
+                model=MODEL,
+                response_format=RESPONSE_FORMAT,
+                messages=proposal_messages(situation)
+            )
+        proposals, report = VALIDATOR.check(response.choices[0].message.content)
+        if report["missing"] or report["missing_options"]:
+            print(f"  -> Incomplete proposals {report['errors']}; requesting only the missing pieces.")
+            follow_up = client.chat.completions.create(
+                model=MODEL,
+                response_format=RESPONSE_FORMAT,
+                messages=VALIDATOR.follow_up_messages(SYSTEM_PROMPT, situation, report)
+            )
+            proposals, report = VALIDATOR.merge(report, follow_up.choices[0].message.content)
+        print(f"  -> AI has generated {len(proposals['options'])} viable proposals.")
+        if cache is not None and proposals.get("options"):
+            cache.put(key, proposals)
+        return proposals
+    except Exception as e:
+        print(f"  -> ERROR: AI analysis failed: {e}")
+        return {"options": []}
+
+# --- Streamed Proposals ---
+
+class OptionStreamParser:
+    """
+    Incrementally scans a streamed JSON response and returns each element of the
+    top-level "options" array as soon as its closing brace arrives. Text is scanned
+    once; only finished options are handed to json.loads.
+
+    Every element seen is kept in `options`, in order; one that isn't valid JSON is
+    kept as {} (so positions match the response) and described in `errors`.
+    """
+
+    def __init__(self):
+        self.options = []
+        self.errors = []
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.string_start = 0
+        self.last_key = None
+        self.in_options = False
+        self.option_start = None
+
+    def feed(self, text: str) -> list[dict]:
+        self.buffer += text
+        completed = []
+        buffer = self.buffer
+        for i in range(self.pos, len(buffer)):
+            c = buffer[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif c == "\\":
+                    self.escaped = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        self.last_key = buffer[self.string_start + 1:i]
+            elif c == '"':
+                self.in_string = True
+                self.string_start = i
+            elif c in "{[":
+                self.depth += 1
+                if c == "[" and self.depth == 2 and self.last_key == "options":
+                    self.in_options = True
+                elif c == "{" and self.depth == 3 and self.in_options:
+                    self.option_start = i
+            elif c in "}]":
+                if c == "}" and self.depth == 3 and self.option_start is not None:
+                    try:
+                        option = json.loads(buffer[self.option_start:i + 1])
+                    except ValueError as e:
+                        self.errors.append(f"options[{len(self.options)}]: not valid JSON ({e})")
+                        option = {}
+                    self.options.append(option)
+                    completed.append(option)
+                    self.option_start = None
+                elif c == "]" and self.depth == 2:
+                    self.in_options = False
+                self.depth -= 1
+        self.pos = len(buffer)
+        return completed
+
+def stream_proposals(situation: str, stream_client: OpenAI | None = None):
+    """
+    Streams the analysis of `situation` and yields each proposed option as soon as it
+    is complete, for HumanInTheLoop.get_human_validation_streaming.
+
+    Each option goes through VALIDATOR as it completes, exactly like the blocking
+    path; one that can't be repaired is reported and held back. Once the stream ends,
+    whatever is still missing (held-back options, unparseable or cut-off ones) is
+    requested in one follow-up call, and the options it completes are yielded too.
+    """
+    stream_client = stream_client or client
+    parser = OptionStreamParser()
+    try:
+        stream = stream_client.chat.completions.create(
+            model=MODEL,
+            response_format=RESPONSE_FORMAT,
+            messages=proposal_messages(situation),
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                for option in parser.feed(chunk.choices[0].delta.content):
+                    checked, report = VALIDATOR.check({"options": [option]})
+                    if checked["options"]:
+                        yield checked["options"][0]
+                    elif option:
+                        errors = [f"{error.path.partition('.')[2]}: {error.problem}" for error in report["errors"]]
+                        print(f"  -> Option '{option.get('name')}' is incomplete ({'; '.join(errors)}); holding it back.")
+                    else:
+                        print(f"  -> ERROR: {parser.errors[-1] if parser.errors else 'empty option'}; holding it back.")
+    except Exception as e:
+        print(f"  -> ERROR: AI analysis failed: {e}")
+
+    proposals, report = VALIDATOR.check({"options": parser.options})
+    if not (report["missing"] or report["missing_options"]):
+        return
+    print("  -> Requesting only the missing pieces.")
+    try:
+        follow_up = stream_client.chat.completions.create(
+            model=MODEL,
+            response_format=RESPONSE_FORMAT,
+            messages=VALIDATOR.follow_up_messages(SYSTEM_PROMPT, situation, report)
         )
-        proposals = json.loads(response.choices[0].message.content)
-        print("  -> AI has generated three viable proposals.")
+    except Exception as e:
+        print(f"  -> ERROR: follow-up request failed: {e}")
+        return
+    _, merged = VALIDATOR.merge(report, follow_up.choices[0].message.content)
+    for i, option in enumerate(merged["partial"]):
+        # Yield what the follow-up completed: held-back options and new ones.
+        if (i in report["missing"] or i >= len(report["partial"])) and i not in merged["missing"]:
+            yield option
+
+# --- Fleet-Wide Analysis ---
+
+_async_client = None
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    The shared async client. It keeps one connection pool for every concurrent
+    analysis instead of opening a connection per shipment. Like any pooled client,
+    it belongs to the event loop it was first used in.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI()
+    return _async_client
+
+async def _resilient_completion(async_client: AsyncOpenAI, situation: str, resilience):
+    # The caller does its own retrying, so the client's built-in retries are switched off.
+    async_client = async_client.with_options(max_retries=0)
+    return await resilience.call(lambda: async_client.chat.completions.create(
+        model=MODEL,
+        response_format=RESPONSE_FORMAT,
+        messages=proposal_messages(situation),
+        timeout=resilience.attempt_timeout,
+    ))
+
+async def _resilient_completion_once(situation: str, resilience):
+    # Mirrors the sync client's settings in a short-lived async client for one call.
+    async with AsyncOpenAI(base_url=client.base_url, api_key=client.api_key) as async_client:
+        return await _resilient_completion(async_client, situation, resilience)
+
+async def analyze_situation_async(situation: str, client: AsyncOpenAI | None = None, timeout: float = 60.0,
+                                  cache=None, resilience=None) -> dict:
+    """
+    The async counterpart of ai_logistics_analyst for one situation, without the banner.
+    Cache reads and writes run on worker threads, so a busy SQLite file never blocks
+    the event loop.
+    """
+    if cache is not None:
+        key = cache.make_key(situation, SYSTEM_PROMPT, MODEL, RESPONSE_FORMAT)
+        proposals = await asyncio.to_thread(cache.get, key)
+        if proposals is not None:
+            return proposals
+    client = client or get_async_client()
+    try:
+        if resilience is not None:
+            response = await _resilient_completion(client, situation, resilience)
+        else:
+            response = await client.chat.completions.create(
+                model=MODEL,
+                response_format=RESPONSE_FORMAT,
+                messages=proposal_messages(situation),
+                timeout=timeout,
+            )
+        proposals, report = VALIDATOR.check(response.choices[0].message.content)
+        if report["missing"] or report["missing_options"]:
+            follow_up = await client.chat.completions.create(
+                model=MODEL,
+                response_format=RESPONSE_FORMAT,
+                messages=VALIDATOR.follow_up_messages(SYSTEM_PROMPT, situation, report),
+                timeout=timeout,
+            )
+            proposals, report = VALIDATOR.merge(report, follow_up.choices[0].message.content)
+        if cache is not None and proposals.get("options"):
+            await asyncio.to_thread(cache.put, key, proposals)
         return proposals
     except Exception as e:
         print(f"  -> ERROR: AI analysis failed: {e}")
         return {"options": []}
 
-def execute_final_plan(approved_plan: str):
+async def analyze_situations(situations, concurrency: int = 64, timeout: float = 60.0,
+                             client: AsyncOpenAI | None = None, cache=None, resilience=None):
+    """
+    Analyzes many situations concurrently and yields (key, proposals) as each one completes.
+
+    `situations` is either a dict of shipment ID -> situation text, or a list of
+    situation texts (keys are then list positions). At most `concurrency` requests are
+    in flight at once, and each has its own `timeout` in seconds. A failed or timed-out
+    analysis yields {"options": []}, like ai_logistics_analyst. Pass a
+    logistics_cache.ProposalCache as `cache` to answer repeat situations from disk, and
+    an llm_resilience.ResilientCaller as `resilience` to retry and hedge (its own
+    attempt_timeout then replaces `timeout`).
+    """
+    items = situations.items() if isinstance(situations, dict) else enumerate(situations)
+    client = client or get_async_client()
+    limit = asyncio.Semaphore(concurrency)
+
+    async def analyze(key, situation):
+        async with limit:
+            return key, await analyze_situation_async(situation, client, timeout, cache, resilience)
+
+    for next_done in asyncio.as_completed([analyze(key, situation) for key, situation in items]):
+        yield await next_done
+    if cache is not None:
+        await asyncio.to_thread(cache.flush)
+
+def execute_final_plan(approved_plan: str, shipment_id: str | None = None, executor=None,
+                       eta_impact_hours: float | None = None, plan_id: str | None = None):
     """
-    Simulates the execution of the human-approved plan.
+    Simulates the execution of the human-approved plan. With a
+    logistics_execution.PlanExecutor it is carried out for real: dispatch, notify and
+    the database update, each idempotent. Many approved plans at once should go to
+    PlanExecutor.execute (or a PlanBatcher) directly, so they share one transaction.
+    An executor needs the plan's shipment_id and a plan_id naming this approval (e.g.
+    the decision ID), so the same plan approved again later is not taken for a
+    retry; both are checked before anything runs.
     """
+    if executor is not None and not (shipment_id and plan_id):
+        raise ValueError("execute_final_plan needs a shipment_id and a plan_id when given an executor")
     print("\n" + "="*50)
     print("✅ EXECUTION CONFIRMED ✅")
     print("="*50)
     print(f"Executing the human-approved plan: '{approved_plan}'")
-    print("  -> Rerouting instructions dispatched to driver.")
-    print("  -> Notifying customer of potential delay.")
-    print("  -> Updating logistics database with new ETA.")
+    if executor is not None:
+        result = executor.execute([{"shipment_id": shipment_id, "plan": approved_plan,
+                                    "eta_impact_hours": eta_impact_hours, "plan_id": plan_id}])
+        if result["failed_plans"]:
+            raise RuntimeError(f"the plan for {shipment_id} did not complete; executing it again resumes it")
+    else:
+        print("  -> Rerouting instructions dispatched to driver.")
+        print("  -> Notifying customer of potential delay.")
+        print("  -> Updating logistics database with new ETA.")
     print("\nWorkflow complete.")
 
 # --- Main Execution ---
-if __name__ == "__main__":
+if __name__ == "__main__" and "--fleet" in sys.argv:
+    # Fleet demo: python logistics.py --fleet [shipments], against the local stand-in LLM.
+    from llm_standin import start_standin_server, proposals_reply
+
+    shipments = int(sys.argv[-1]) if sys.argv[-1].isdigit() else 500
+    server, base_url = start_standin_server(delay=0.5, reply=proposals_reply)
+    situations = {
+        f"#{i:03d}-A": f"Shipment #{i:03d}-A is in Kansas; a storm will close I-70 and I-80 for 48 hours."
+        for i in range(shipments)
+    }
+
+    async def fleet():
+        started = time.perf_counter()
+        analyzed = 0
+        async with AsyncOpenAI(base_url=base_url, api_key="standin") as standin_client:
+            async for shipment_id, proposals in analyze_situations(situations, concurrency=500, client=standin_client):
+                analyzed += bool(proposals["options"])
+        return analyzed, time.perf_counter() - started
+
+    analyzed, elapsed = asyncio.run(fleet())
+    print(f"Analyzed {analyzed}/{shipments} shipments in {elapsed:.2f}s (one call takes {server.delay}s).")
+    server.shutdown()
+elif __name__ == "__main__" and "--stream" in sys.argv:
+    # Streaming demo: python logistics.py --stream, against the local stand-in LLM.
+    from llm_standin import start_standin_server, proposals_reply
+
+    server, base_url = start_standin_server(delay=0.5, reply=proposals_reply, chunk_delay=0.02)
+    started = time.perf_counter()
+    arrivals = []
+
+    def timed(options):
+        for option in options:
+            arrivals.append(time.perf_counter() - started)
+            yield option
+
+    option_stream = stream_proposals("Shipment #734-A is in Kansas; a storm will close I-70 and I-80 for 48 hours.",
+                                     OpenAI(base_url=base_url, api_key="standin"))
+    final_decision = HumanInTheLoop().get_human_validation_streaming(timed(option_stream))
+    print(f"\nOptions arrived at {', '.join(f'{t:.2f}s' for t in arrivals)} (decision: {final_decision}).")
+    server.shutdown()
+elif __name__ == "__main__":
     # 1. The problem arises
     current_situation = (
         "Critical shipment #734-A, en route from Los Angeles to New York, is currently in Kansas. "
@@ -106,9 +436,11 @@ if __name__ == "__main__":
     # 2. The AI does the heavy lifting
     ai_proposals = ai_logistics_analyst(current_situation)
 
-    # 3. The Human is brought "in the loop" for the critical decision
+    # 3. Routine proposals are approved by policy; the Human is brought "in the loop"
+    #    for everything else, including every critical shipment
     hitl_validator = HumanInTheLoop()
-    final_decision = hitl_validator.get_human_validation(ai_proposals)
+    final_decision = approve_or_escalate(PolicyEngine(), ai_proposals, hitl_validator.get_human_validation,
+                                         priority="critical", shipment_id="#734-A")
 
     # 4. The system executes based on the human's choice
     if final_decision and final_decision != "REJECTED":
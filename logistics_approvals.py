@@ -0,0 +1,358 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from logistics import execute_final_plan
+
+# A decision moves pending -> approved | rejected exactly once; approved decisions
+# are then executed, and `executed` records when the callback finished. A process
+# claims a decision before executing it: `executing_by` names the claimant and the
+# claim lapses at `lease_until`, so a crashed process's decisions can be taken over.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    shipment_id TEXT,
+    situation TEXT NOT NULL,
+    proposals TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    choice TEXT,
+    operator TEXT,
+    created REAL NOT NULL,
+    decided REAL,
+    executed REAL,
+    execution_error TEXT,
+    executing_by TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS decisions_status ON decisions (status, id);
+"""
+
+class DecisionConflict(Exception):
+    """Raised when a decision is no longer pending, e.g. another operator got there first."""
+
+class ApprovalQueue:
+    """
+    The persistent queue of proposals waiting for a human, in a SQLite file that any
+    number of processes can share (WAL mode, one connection per process and thread).
+    """
+
+    def __init__(self, path: str = "logistics_approvals.sqlite3", busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        db = self._connection()
+        db.executescript(_SCHEMA)
+        columns = {row["name"] for row in db.execute("PRAGMA table_info(decisions)")}
+        for column, kind in (("executing_by", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:  # a file from before execution claims
+                db.execute(f"ALTER TABLE decisions ADD COLUMN {column} {kind}")
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    @staticmethod
+    def _decision(row: sqlite3.Row | None) -> dict | None:
+        if row is None:
+            return None
+        decision = dict(row)
+        decision["proposals"] = json.loads(decision["proposals"])
+        return decision
+
+    def submit(self, situation: str, proposals: dict, shipment_id: str | None = None) -> int:
+        """Queues proposals for a decision and returns the decision ID."""
+        cursor = self._connection().execute(
+            "INSERT INTO decisions (shipment_id, situation, proposals, created) VALUES (?, ?, ?, ?)",
+            (shipment_id, situation, json.dumps(proposals), time.time()))
+        return cursor.lastrowid
+
+    def get(self, decision_id: int) -> dict | None:
+        return self._decision(self._connection().execute(
+            "SELECT * FROM decisions WHERE id = ?", (decision_id,)).fetchone())
+
+    def decisions(self, status: str | None = "pending", limit: int = 100) -> list[dict]:
+        """Decisions with the given status (None for all), oldest first."""
+        if status is None:
+            rows = self._connection().execute("SELECT * FROM decisions ORDER BY id LIMIT ?", (limit,))
+        else:
+            rows = self._connection().execute(
+                "SELECT * FROM decisions WHERE status = ? ORDER BY id LIMIT ?", (status, limit))
+        return [self._decision(row) for row in rows]
+
+    def decide(self, decision_id: int, choice, operator: str | None = None) -> dict:
+        """
+        Records an operator's decision. `choice` is an option number (1-based), an
+        option name, or "reject". Raises KeyError for an unknown decision, ValueError
+        for an invalid choice and DecisionConflict if it was already decided.
+        """
+        decision = self.get(decision_id)
+        if decision is None:
+            raise KeyError(decision_id)
+        options = decision["proposals"].get("options", [])
+        if str(choice).lower() == "reject":
+            status, plan = "rejected", "REJECTED"
+        else:
+            names = [option.get("name") for option in options]
+            if str(choice).isdigit() and 1 <= int(choice) <= len(options):
+                plan = names[int(choice) - 1]
+            elif choice in names:
+                plan = choice
+            else:
+                raise ValueError(f"choose 1-{len(options)}, an option name, or 'reject'")
+            status = "approved"
+
+        updated = self._connection().execute(
+            "UPDATE decisions SET status = ?, choice = ?, operator = ?, decided = ? WHERE id = ? AND status = 'pending'",
+            (status, plan, operator, time.time(), decision_id)).rowcount
+        if not updated:
+            raise DecisionConflict(f"decision {decision_id} is already {self.get(decision_id)['status']}")
+        return self.get(decision_id)
+
+    def unexecuted(self) -> list[dict]:
+        """Approved decisions whose execution never finished, e.g. after a crash."""
+        return [self._decision(row) for row in self._connection().execute(
+            "SELECT * FROM decisions WHERE status = 'approved' AND executed IS NULL ORDER BY id")]
+
+    def claim(self, decision_id: int, owner: str, lease: float) -> bool:
+        """
+        Atomically claims an approved, unexecuted decision for `owner` for `lease`
+        seconds. False if it is executed, or claimed by someone whose lease holds.
+        """
+        now = time.time()
+        return bool(self._connection().execute(
+            "UPDATE decisions SET executing_by = ?, lease_until = ? WHERE id = ? AND status = 'approved' "
+            "AND executed IS NULL AND (executing_by IS NULL OR lease_until < ?)",
+            (owner, now + lease, decision_id, now)).rowcount)
+
+    def mark_executed(self, decision_id: int, error: str | None = None):
+        self._connection().execute("UPDATE decisions SET executed = ?, execution_error = ? WHERE id = ?",
+                                   (time.time(), error, decision_id))
+
+def execute_decision(decision: dict):
+    """The default approval callback: hands the chosen plan to execute_final_plan."""
+    chosen = next((option for option in decision["proposals"].get("options", [])
+                   if option.get("name") == decision["choice"]), {})
+    execute_final_plan(decision["choice"], decision["shipment_id"],
+                       eta_impact_hours=chosen.get("eta_impact_hours"), plan_id=f"decision-{decision['id']}")
+
+class ApprovalService:
+    """
+    Decouples analysis from human response time. Analysts submit() and move on;
+    operators decide through the HTTP interface, many decisions at once; approved
+    decisions are executed by `on_approved` on a small worker pool, so a slow
+    execution never holds up an operator's request.
+
+    Approved decisions left unexecuted by a previous run are executed on start().
+    Each execution first claims its decision in the shared file, so when several
+    processes share it, a decision is executed by one of them; a claim whose
+    process died lapses after `execution_lease` seconds.
+    Changes are also published as server-sent events for live operator consoles.
+    With a logistics_policy.PolicyEngine, proposals the policy allows are approved
+    on submit (operator "policy:<rule>") and never reach an operator.
+    """
+
+    def __init__(self, queue: ApprovalQueue, on_approved=execute_decision, workers: int = 4,
+                 history: int = 1000, policy=None, execution_lease: float = 300.0):
+        self.queue = queue
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.execution_lease = execution_lease
+        self.on_approved = on_approved
+        self.policy = policy
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._changed = threading.Condition()
+        self._events = deque(maxlen=history)
+        self._version = 0
+        self.server = None
+
+    def _publish(self, kind: str, decision: dict):
+        with self._changed:
+            self._version += 1
+            self._events.append((self._version, kind, decision))
+            self._changed.notify_all()
+
+    def events_since(self, version: int, timeout: float) -> list[tuple]:
+        """Blocks until there are events newer than `version` or `timeout` passes."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._version > version, timeout)
+            return [event for event in self._events if event[0] > version]
+
+    def submit(self, situation: str, proposals: dict, shipment_id: str | None = None,
+               priority: str | None = None) -> int:
+        decision_id = self.queue.submit(situation, proposals, shipment_id)
+        self._publish("submitted", self.queue.get(decision_id))
+        if self.policy is not None:
+            verdict = self.policy.decide(proposals, priority, shipment_id)
+            if verdict["action"] == "approve":
+                self.decide(decision_id, verdict["choice"], f"policy:{verdict['rule']}")
+        return decision_id
+
+    def decide(self, decision_id: int, choice, operator: str | None = None) -> dict:
+        decision = self.queue.decide(decision_id, choice, operator)
+        self._publish(decision["status"], decision)
+        if decision["status"] == "approved":
+            self._executor.submit(self._execute, decision)
+        return decision
+
+    def _execute(self, decision: dict):
+        if not self.queue.claim(decision["id"], self.owner, self.execution_lease):
+            return  # executed already, or another process is executing it
+        error = None
+        try:
+            self.on_approved(decision)
+        except Exception as e:
+            error = repr(e)
+            print(f"  -> ERROR: executing decision {decision['id']} failed: {e}")
+        self.queue.mark_executed(decision["id"], error)
+        self._publish("executed", self.queue.get(decision["id"]))
+
+    def start(self, host: str = "127.0.0.1", port: int = 8090) -> str:
+        """
+        Resumes interrupted executions and serves the operator interface on a
+        background thread. Returns its base URL.
+        """
+        for decision in self.queue.unexecuted():
+            self._executor.submit(self._execute, decision)
+        self.server = ThreadingHTTPServer((host, port), ApprovalHandler)
+        self.server.daemon_threads = True
+        self.server.service = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+        self._executor.shutdown(wait=True)
+
+class ApprovalHandler(BaseHTTPRequestHandler):
+    """
+    GET  /decisions?status=pending          list decisions (status=all for every one)
+    GET  /decisions/<id>                    one decision with its proposals
+    POST /decisions/<id>                    {"choice": 2 | "<option name>" | "reject", "operator": "..."}
+    GET  /events?since=<n>                  server-sent events for every change after event n
+    """
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _int_param(self, query: dict, name: str, default: int) -> int | None:
+        """A non-negative integer query parameter; answers 400 and returns None otherwise."""
+        value = query.get(name, [str(default)])[0]
+        if not value.isdigit():
+            self._send_json(400, {"error": f"{name} must be a non-negative integer, got {value!r}"})
+            return None
+        return int(value)
+
+    def do_GET(self):
+        service = self.server.service
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        match = re.fullmatch(r"/decisions/(\d+)", url.path)
+        if url.path == "/decisions":
+            status = query.get("status", ["pending"])[0]
+            limit = self._int_param(query, "limit", 100)
+            if limit is not None:
+                self._send_json(200, service.queue.decisions(None if status == "all" else status, limit))
+        elif match:
+            decision = service.queue.get(int(match.group(1)))
+            self._send_json(200, decision) if decision else self._send_json(404, {"error": "no such decision"})
+        elif url.path == "/events":
+            since = self._int_param(query, "since", 0)
+            if since is not None:
+                self._stream_events(service, since)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        match = re.fullmatch(r"/decisions/(\d+)", urlparse(self.path).path)
+        if not match:
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError('expected a JSON object like {"choice": 2, "operator": "..."}')
+            decision = self.server.service.decide(int(match.group(1)), request.get("choice"), request.get("operator"))
+        except KeyError:
+            self._send_json(404, {"error": "no such decision"})
+        except DecisionConflict as e:
+            self._send_json(409, {"error": str(e)})
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+        else:
+            self._send_json(200, decision)
+
+    def _stream_events(self, service: ApprovalService, since: int):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            while True:
+                for version, kind, decision in service.events_since(since, timeout=15.0):
+                    self.wfile.write(f"id: {version}\nevent: {kind}\ndata: {json.dumps(decision)}\n\n".encode())
+                    since = version
+                self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except ConnectionError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    import tempfile
+    from urllib.request import Request, urlopen
+
+    service = ApprovalService(ApprovalQueue(os.path.join(tempfile.mkdtemp(), "approvals.sqlite3")))
+    base_url = service.start(port=0)
+    print(f"Operator interface on {base_url}/decisions")
+
+    # The analyst side: queue proposals for ten shipments without waiting for anyone.
+    proposals = {"options": [
+        {"name": "Southern Reroute via I-40", "strategy": "Divert south to I-40.", "cost_impact": 1800,
+         "eta_impact_hours": 10, "risk": "Low"},
+        {"name": "Hold in Kansas City", "strategy": "Wait out the closures.", "cost_impact": 950,
+         "eta_impact_hours": 48, "risk": "Medium"},
+    ]}
+    started = time.perf_counter()
+    ids = [service.submit(f"Shipment #{i:03d}-A is in the storm's path.", proposals, f"#{i:03d}-A") for i in range(10)]
+    print(f"Queued {len(ids)} decisions in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    # The operator side: three operators decide concurrently over HTTP.
+    def operator(name: str, decision_ids: list[int]):
+        for decision_id in decision_ids:
+            body = json.dumps({"choice": "reject" if decision_id % 5 == 0 else 1, "operator": name}).encode()
+            with urlopen(Request(f"{base_url}/decisions/{decision_id}", body, method="POST")) as response:
+                json.load(response)
+
+    threads = [threading.Thread(target=operator, args=(name, ids[i::3])) for i, name in enumerate(["ana", "ben", "cy"])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    service.stop()
+    decided = service.queue.decisions(status=None)
+    print(f"\n{sum(d['status'] == 'approved' for d in decided)} approved and executed, "
+          f"{sum(d['status'] == 'rejected' for d in decided)} rejected, "
+          f"{sum(d['status'] == 'pending' for d in decided)} still pending")
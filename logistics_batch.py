@@ -0,0 +1,258 @@
+import json
+import os
+import time
+import uuid
+
+from openai import OpenAI
+
+from logistics import MODEL, RESPONSE_FORMAT, VALIDATOR, proposal_messages
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+class OpenAIBatchBackend:
+    """
+    Runs job files through the OpenAI Batch API (or any server that speaks it, such
+    as llm_standin). Batch requests are billed at a fraction of the interactive rate
+    in exchange for a completion window of up to 24 hours.
+
+    Any object with the same four methods can be used as a BatchJob backend:
+    submit(job_path, job_key) -> batch_id, find(job_key, since) -> the batch_id
+    submitted with that key (or None), poll(batch_id) -> dict with status, completed,
+    failed and total, and download(batch_id, path) -> bool (False if no output yet).
+    """
+
+    def __init__(self, client: OpenAI | None = None, completion_window: str = "24h"):
+        self.client = client or OpenAI()
+        self.completion_window = completion_window
+
+    def submit(self, job_path: str, job_key: str) -> str:
+        with open(job_path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(input_file_id=uploaded.id, endpoint="/v1/chat/completions",
+                                           completion_window=self.completion_window,
+                                           metadata={"batch_job": job_key})
+        return batch.id
+
+    def find(self, job_key: str, since: float) -> str | None:
+        # Batches are listed newest first, so the scan stops at the first one older than `since`.
+        for batch in self.client.batches.list(limit=100):
+            if batch.created_at < since:
+                return None
+            if (batch.metadata or {}).get("batch_job") == job_key:
+                return batch.id
+        return None
+
+    def poll(self, batch_id: str) -> dict:
+        batch = self.client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return {
+            "status": batch.status,
+            "completed": counts.completed if counts else 0,
+            "failed": counts.failed if counts else 0,
+            "total": counts.total if counts else 0,
+        }
+
+    def download(self, batch_id: str, path: str) -> bool:
+        batch = self.client.batches.retrieve(batch_id)
+        if not batch.output_file_id:
+            return False
+        content = self.client.files.content(batch.output_file_id).content
+        with open(path + ".part", "wb") as f:
+            f.write(content)
+        os.replace(path + ".part", path)
+        return True
+
+class BatchJob:
+    """
+    One offline analysis of many shipments, kept in `job_dir`:
+
+      requests.jsonl            one chat request per shipment, custom_id = shipment ID
+      state.json                the submitted batch IDs and last known progress
+      results.jsonl             the backend's output, once downloaded
+      follow_up_requests.jsonl  requests for the fields the first answers left out
+      follow_up_results.jsonl   their output
+
+    Every step checks what is already on disk, so after an interruption run() (in
+    this or any later process) resumes polling the batch that was already submitted
+    instead of paying for it twice. A submission is recorded in state.json before it
+    is sent, under a key the batch carries as metadata; if the process dies before
+    the batch ID is saved, the next submit() finds the batch by that key.
+
+    Answers with missing fields get the same follow-up as the interactive path,
+    sent together as one follow-up batch.
+    """
+
+    def __init__(self, job_dir: str, backend=None, poll_interval: float = 30.0):
+        self.job_dir = job_dir
+        self.backend = backend or OpenAIBatchBackend()
+        self.poll_interval = poll_interval
+        os.makedirs(job_dir, exist_ok=True)
+        self.requests_path = os.path.join(job_dir, "requests.jsonl")
+        self.state_path = os.path.join(job_dir, "state.json")
+        self.results_path = os.path.join(job_dir, "results.jsonl")
+        self.follow_up_requests_path = os.path.join(job_dir, "follow_up_requests.jsonl")
+        self.follow_up_results_path = os.path.join(job_dir, "follow_up_results.jsonl")
+        self.state = {}
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                self.state = json.load(f)
+
+    def _save_state(self):
+        with open(self.state_path + ".part", "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(self.state_path + ".part", self.state_path)
+
+    def prepare(self, situations: dict) -> int:
+        """
+        Writes the job file for a dict of shipment ID -> situation, unless it exists.
+        """
+        if not os.path.exists(self.requests_path):
+            with open(self.requests_path + ".part", "w") as f:
+                for shipment_id, situation in situations.items():
+                    f.write(json.dumps({
+                        "custom_id": str(shipment_id),
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": {"model": MODEL, "response_format": RESPONSE_FORMAT,
+                                 "messages": proposal_messages(situation)},
+                    }) + "\n")
+            os.replace(self.requests_path + ".part", self.requests_path)
+        with open(self.requests_path) as f:
+            return sum(1 for _ in f)
+
+    def submit(self, prefix: str = "") -> str:
+        """
+        Submits the job file (with prefix "follow_up_", the follow-up file) once.
+        """
+        if f"{prefix}batch_id" not in self.state:
+            path = self.follow_up_requests_path if prefix else self.requests_path
+            batch_id = None
+            if f"{prefix}job_key" in self.state:
+                # An earlier submit() got this far and then died; the batch may exist.
+                batch_id = self.backend.find(self.state[f"{prefix}job_key"], self.state[f"{prefix}submit_started"] - 60)
+            else:
+                self.state[f"{prefix}job_key"] = uuid.uuid4().hex
+                self.state[f"{prefix}submit_started"] = time.time()
+                self._save_state()
+            self.state[f"{prefix}batch_id"] = batch_id or self.backend.submit(path, self.state[f"{prefix}job_key"])
+            self.state[f"{prefix}submitted_at"] = time.time()
+            self._save_state()
+        return self.state[f"{prefix}batch_id"]
+
+    def wait(self, progress=None, prefix: str = "") -> dict:
+        """
+        Polls until the batch reaches a terminal status; `progress` is called with
+        every poll result.
+        """
+        while True:
+            status = self.backend.poll(self.state[f"{prefix}batch_id"])
+            self.state[f"{prefix}progress"] = status
+            self._save_state()
+            if progress is not None:
+                progress(status)
+            if status["status"] in TERMINAL_STATUSES:
+                return status
+            time.sleep(self.poll_interval)
+
+    def _answers(self, batch_id: str, path: str) -> dict:
+        """custom_id -> message content for every request that succeeded."""
+        if not os.path.exists(path):
+            self.backend.download(batch_id, path)
+        answers = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    item = json.loads(line)
+                    response = item.get("response") or {}
+                    if response.get("status_code") == 200:
+                        answers[item.get("custom_id")] = response["body"]["choices"][0]["message"]["content"]
+        return answers
+
+    def _follow_up(self, bodies: dict, reports: dict, progress=None) -> dict:
+        """Runs one follow-up batch for the incomplete answers; custom_id -> its content."""
+        if not os.path.exists(self.follow_up_requests_path):
+            with open(self.follow_up_requests_path + ".part", "w") as f:
+                for custom_id, report in reports.items():
+                    messages = bodies[custom_id]["messages"]
+                    f.write(json.dumps({
+                        "custom_id": custom_id,
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": {"model": MODEL, "response_format": RESPONSE_FORMAT,
+                                 "messages": VALIDATOR.follow_up_messages(messages[0]["content"],
+                                                                          messages[-1]["content"], report)},
+                    }) + "\n")
+            os.replace(self.follow_up_requests_path + ".part", self.follow_up_requests_path)
+        self.submit("follow_up_")
+        self.wait(progress, "follow_up_")
+        return self._answers(self.state["follow_up_batch_id"], self.follow_up_results_path)
+
+    def results(self, progress=None) -> dict:
+        """
+        Joins the output back to shipment IDs: shipment ID -> validated proposals.
+        Answers with missing fields are completed by one follow-up batch first.
+        Failed requests, and shipments missing from the output, map to {"options": []}.
+        """
+        with open(self.requests_path) as f:
+            bodies = {item["custom_id"]: item["body"] for item in map(json.loads, f)}
+        joined = {custom_id: {"options": []} for custom_id in bodies}
+        reports = {}
+        for custom_id, content in self._answers(self.state["batch_id"], self.results_path).items():
+            if custom_id not in joined:
+                continue
+            joined[custom_id], report = VALIDATOR.check(content)
+            if report["missing"] or report["missing_options"]:
+                reports[custom_id] = report
+        if reports:
+            for custom_id, content in self._follow_up(bodies, reports, progress).items():
+                if custom_id in reports:
+                    joined[custom_id] = VALIDATOR.merge(reports[custom_id], content)[0]
+        return joined
+
+    def run(self, situations: dict, progress=None) -> dict:
+        self.prepare(situations)
+        self.submit()
+        self.wait(progress)
+        return self.results(progress)
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    import tempfile
+    from llm_standin import start_standin_server, proposals_reply
+
+    def reply(messages):
+        # Every 100th shipment's first answer leaves out an ETA; the follow-up supplies it.
+        if "previous answer was incomplete" in messages[-1]["content"]:
+            return json.dumps({"patches": [{"index": 0, "eta_impact_hours": 10}], "new_options": []})
+        answer = json.loads(proposals_reply(messages))
+        if int(messages[-1]["content"].split("#")[1][:4]) % 100 == 0:
+            del answer["options"][0]["eta_impact_hours"]
+        return json.dumps(answer)
+
+    server, base_url = start_standin_server(reply=reply, batch_delay=0.001)
+    backend = OpenAIBatchBackend(OpenAI(base_url=base_url, api_key="standin"))
+    job_dir = tempfile.mkdtemp()
+    situations = {f"#{i:04d}-A": f"Shipment #{i:04d}-A is at risk from the storm over Kansas." for i in range(2000)}
+
+    # Submit, then "crash" after the batch is created but before its ID is saved...
+    class CrashAfterSubmit(OpenAIBatchBackend):
+        def submit(self, job_path, job_key):
+            super().submit(job_path, job_key)
+            raise KeyboardInterrupt
+
+    job = BatchJob(job_dir, CrashAfterSubmit(backend.client), poll_interval=0.2)
+    print(f"Wrote {job.prepare(situations)} requests")
+    try:
+        job.submit()
+    except KeyboardInterrupt:
+        print("Crashed before saving the batch ID")
+    del job
+
+    # ...and resume from the job directory as a fresh process would.
+    resumed = BatchJob(job_dir, backend, poll_interval=0.2)
+    results = resumed.run(situations, progress=lambda s: print(f"  {s['status']}: {s['completed']}/{s['total']}"))
+    print(f"Resumed batch {resumed.state['batch_id']} (submitted once, plus one follow-up batch: "
+          f"{len(server.batches) == 2})")
+    print(f"{sum(len(p['options']) == 3 for p in results.values())}/{len(results)} shipments have all three options; "
+          f"#0042-A -> {results['#0042-A']['options'][0]['name']}")
+    server.shutdown()
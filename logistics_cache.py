@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# One row per cached response. last_used drives LRU eviction, created drives the TTL.
+# Hit/miss counters live in the same database, so stats cover every process using it.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS proposals (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS proposals_last_used ON proposals (last_used);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+"""
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_situation(situation: str) -> str:
+    """
+    Situations that differ only in case or whitespace share a cache entry.
+    """
+    return _WHITESPACE.sub(" ", situation).strip().casefold()
+
+class ProposalCache:
+    """
+    A persistent cache of analyst responses in a SQLite file.
+
+    Keys hash the normalized situation together with everything else that shapes the
+    answer: system prompt, model and response_format. Entries expire `ttl` seconds
+    after they were stored, and beyond `max_entries` the least recently used are
+    evicted. The database runs in WAL mode, so several processes can share one file;
+    each process (and thread) opens its own connection.
+
+    A lookup is a plain read and never waits for the write lock. Its LRU touch and
+    hit/miss count are kept in memory and written with the next put(), or once
+    `flush_every` lookups are pending; call flush() before a process exits.
+    """
+
+    def __init__(self, path: str = "logistics_cache.sqlite3", ttl: float = 3600.0, max_entries: int = 10_000,
+                 busy_timeout: float = 5.0, flush_every: int = 100):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.busy_timeout = busy_timeout
+        self.flush_every = flush_every
+        self._local = threading.local()
+        self._pending_lock = threading.Lock()
+        self._touched = {}  # key -> last use not yet written
+        self._counts = {}   # stat -> increment not yet written
+        with self._connection() as db:
+            db.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # A connection must not cross a fork, so it is keyed by process as well as thread.
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    @staticmethod
+    def make_key(situation: str, system_prompt: str, model: str, response_format: dict | None = None) -> str:
+        material = json.dumps([normalize_situation(situation), system_prompt, model, response_format], sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _count(self, db: sqlite3.Connection, name: str, count: int = 1):
+        db.execute("INSERT INTO stats (name, count) VALUES (?, ?) "
+                   "ON CONFLICT (name) DO UPDATE SET count = count + excluded.count", (name, count))
+
+    def get(self, key: str) -> dict | None:
+        """
+        Returns the cached response for `key`, or None on a miss or an expired entry
+        (which put() then replaces, or purge_expired() removes).
+        """
+        now = time.time()
+        row = self._connection().execute("SELECT value, created FROM proposals WHERE key = ?", (key,)).fetchone()
+        if row is not None and now - row[1] > self.ttl:
+            row = None
+        with self._pending_lock:
+            stat = "misses" if row is None else "hits"
+            self._counts[stat] = self._counts.get(stat, 0) + 1
+            if row is not None:
+                self._touched[key] = now
+            flush = self._counts.get("hits", 0) + self._counts.get("misses", 0) >= self.flush_every
+        if flush:
+            self.flush()
+        return None if row is None else json.loads(row[0])
+
+    def _write_pending(self, db: sqlite3.Connection):
+        """Writes the pending touches and counts; the caller holds the write lock."""
+        with self._pending_lock:
+            touched, self._touched = self._touched, {}
+            counts, self._counts = self._counts, {}
+        db.executemany("UPDATE proposals SET last_used = max(last_used, ?) WHERE key = ?",
+                       [(used, key) for key, used in touched.items()])
+        for name, count in counts.items():
+            self._count(db, name, count)
+
+    def flush(self):
+        """Writes the LRU touches and hit/miss counts of lookups since the last write."""
+        db = self._connection()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            self._write_pending(db)
+
+    def put(self, key: str, value: dict):
+        """
+        Stores a response, evicting the least recently used entries beyond max_entries.
+        """
+        db = self._connection()
+        now = time.time()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            self._write_pending(db)
+            db.execute("INSERT OR REPLACE INTO proposals (key, value, created, last_used) VALUES (?, ?, ?, ?)",
+                       (key, json.dumps(value), now, now))
+            evicted = db.execute("DELETE FROM proposals WHERE key IN (SELECT key FROM proposals "
+                                 "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,)).rowcount
+            if evicted:
+                self._count(db, "evictions", evicted)
+
+    def purge_expired(self) -> int:
+        db = self._connection()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            removed = db.execute("DELETE FROM proposals WHERE created < ?", (time.time() - self.ttl,)).rowcount
+            if removed:
+                self._count(db, "expired", removed)
+        return removed
+
+    def stats(self) -> dict:
+        self.flush()
+        db = self._connection()
+        counts = dict(db.execute("SELECT name, count FROM stats").fetchall())
+        hits, misses = counts.get("hits", 0), counts.get("misses", 0)
+        return {
+            "entries": db.execute("SELECT COUNT(*) FROM proposals").fetchone()[0],
+            "hits": hits,
+            "misses": misses,
+            "expired": counts.get("expired", 0),
+            "evictions": counts.get("evictions", 0),
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    import tempfile
+    from multiprocessing import Pool
+
+    path = os.path.join(tempfile.mkdtemp(), "proposals.sqlite3")
+    cache = ProposalCache(path, ttl=60, max_entries=100)
+    situation = "Critical shipment #734-A is in Kansas.   A storm will close I-70 and I-80 for 48 hours."
+    proposals = {"options": [{"name": "Southern Reroute via I-40", "strategy": "Divert south to I-40.",
+                              "cost_impact": 1800, "eta_impact_hours": 10, "risk": "Low"}]}
+
+    key = ProposalCache.make_key(situation, "You are an expert logistics analyst.", "gpt-4-turbo",
+                                 {"type": "json_object"})
+    print(f"First lookup: {cache.get(key)}")
+    cache.put(key, proposals)
+    started = time.perf_counter()
+    resent = ProposalCache.make_key(situation.upper(), "You are an expert logistics analyst.", "gpt-4-turbo",
+                                    {"type": "json_object"})
+    hit = cache.get(resent)
+    print(f"Re-sent situation: {hit['options'][0]['name']} in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    def worker(i):
+        shared = ProposalCache(path, ttl=60, max_entries=100)
+        for j in range(200):
+            key = ProposalCache.make_key(f"shipment {(i * 50 + j) % 120}", "prompt", "gpt-4-turbo")
+            if shared.get(key) is None:
+                shared.put(key, proposals)
+        shared.flush()
+
+    with Pool(4) as pool:
+        pool.map(worker, range(4))
+    print(json.dumps(cache.stats(), indent=2))
@@ -0,0 +1,199 @@
+import math
+import time
+
+def segment_intersects_box(a: tuple, b: tuple, area: tuple) -> bool:
+    """
+    Whether the straight leg from a to b ((lat, lon) points) touches the
+    (min_lat, min_lon, max_lat, max_lon) box. Liang-Barsky clipping: the leg is
+    clipped against each side in turn and misses if nothing is left.
+    """
+    min_lat, min_lon, max_lat, max_lon = area
+    (lat0, lon0), (lat1, lon1) = a, b
+    d_lat, d_lon = lat1 - lat0, lon1 - lon0
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-d_lon, lon0 - min_lon), (d_lon, max_lon - lon0), (-d_lat, lat0 - min_lat), (d_lat, max_lat - lat0)):
+        if p == 0:
+            if q < 0:
+                return False  # parallel to this side and outside it
+        elif p < 0:
+            t0 = max(t0, q / p)
+        else:
+            t1 = min(t1, q / p)
+        if t0 > t1:
+            return False
+    return True
+
+def polyline_intersects_box(points: list[tuple], area: tuple) -> bool:
+    return any(segment_intersects_box(a, b, area) for a, b in zip(points, points[1:] or points))
+
+class CorridorIndex:
+    """
+    Finds the shipments a weather alert affects without scanning every route.
+
+    Routes are sequences of shared road segments (e.g. "I-70 from Denver to Salina"),
+    so the spatial index only has to cover the road network, not 100k polylines:
+
+      cells -> segments   a uniform grid of `cell_deg` degrees over the cells each leg crosses
+      segment -> shipments  which shipments still have that segment ahead of them
+
+    As a shipment moves, advance() drops the segments behind it, so alerts only reach
+    shipments whose remaining route crosses the alert area.
+    """
+
+    def __init__(self, cell_deg: float = 0.25):
+        self.cell_deg = cell_deg
+        self.segments = {}             # segment_id -> (road, polyline points)
+        self.segments_by_cell = {}     # (row, col) -> set of segment_ids
+        self.shipments_by_segment = {}  # segment_id -> set of shipment_ids
+        self.routes = {}               # shipment_id -> remaining segment_ids, in order
+
+    def _cell(self, lat: float, lon: float) -> tuple:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def add_segment(self, segment_id: str, road: str, points: list[tuple]):
+        """
+        Registers a road segment given as a polyline of (lat, lon) points. Every cell
+        a leg passes through is indexed, however briefly it clips it.
+        """
+        self.segments[segment_id] = (road, list(points))
+        size = self.cell_deg
+        for a, b in zip(points, points[1:] or points):
+            (row0, col0), (row1, col1) = self._cell(min(a[0], b[0]), min(a[1], b[1])), self._cell(max(a[0], b[0]), max(a[1], b[1]))
+            for row in range(row0, row1 + 1):
+                for col in range(col0, col1 + 1):
+                    if segment_intersects_box(a, b, (row * size, col * size, (row + 1) * size, (col + 1) * size)):
+                        self.segments_by_cell.setdefault((row, col), set()).add(segment_id)
+        self.shipments_by_segment.setdefault(segment_id, set())
+
+    def track(self, shipment_id: str, segment_ids: list[str]):
+        """
+        Starts (or replaces) tracking of a shipment's remaining route. Raises KeyError,
+        leaving the index unchanged, if a segment isn't registered.
+        """
+        unknown = [segment_id for segment_id in segment_ids if segment_id not in self.shipments_by_segment]
+        if unknown:
+            raise KeyError(f"unknown segments {unknown}")
+        self.remove(shipment_id)
+        self.routes[shipment_id] = list(segment_ids)
+        for segment_id in segment_ids:
+            self.shipments_by_segment[segment_id].add(shipment_id)
+
+    def advance(self, shipment_id: str, segments_done: int = 1):
+        """The shipment finished its next `segments_done` segments; forget them."""
+        route = self.routes[shipment_id]
+        for segment_id in route[:segments_done]:
+            self.shipments_by_segment[segment_id].discard(shipment_id)
+        del route[:segments_done]
+
+    def remove(self, shipment_id: str):
+        for segment_id in self.routes.pop(shipment_id, ()):
+            self.shipments_by_segment[segment_id].discard(shipment_id)
+
+    def segments_in(self, area: tuple) -> set[str]:
+        """Segments with a leg crossing the (min_lat, min_lon, max_lat, max_lon) box."""
+        min_lat, min_lon, max_lat, max_lon = area
+        (row0, col0), (row1, col1) = self._cell(min_lat, min_lon), self._cell(max_lat, max_lon)
+        candidates = set()
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                candidates |= self.segments_by_cell.get((row, col), set())
+        return {segment_id for segment_id in candidates if polyline_intersects_box(self.segments[segment_id][1], area)}
+
+    def corridor_groups(self, area: tuple) -> dict:
+        """
+        Groups the affected shipments by corridor: the set of roads the alert closes
+        on their remaining route. Returns {(road, ...): [shipment_id, ...]}.
+        """
+        shipments_by_road = {}
+        for segment_id in self.segments_in(area):
+            road = self.segments[segment_id][0]
+            shipments_by_road.setdefault(road, set()).update(self.shipments_by_segment[segment_id])
+        # Refine the partition one road at a time with set operations, instead of
+        # building a road set per shipment.
+        groups = {}
+        for road in sorted(shipments_by_road):
+            remaining = shipments_by_road[road]
+            refined = {}
+            for roads, members in groups.items():
+                inside = members & remaining
+                if inside:
+                    refined[roads + (road,)] = inside
+                    members = members - inside
+                    remaining = remaining - inside
+                if members:
+                    refined[roads] = members
+            if remaining:
+                refined[(road,)] = remaining
+            groups = refined
+        return {roads: list(members) for roads, members in groups.items()}
+
+def corridor_situation(alert: dict, roads: tuple, shipment_ids: list[str], listed: int = 10) -> str:
+    """
+    One situation text for a whole corridor group, for ai_logistics_analyst.
+    """
+    shown = ", ".join(sorted(shipment_ids)[:listed])
+    more = f" and {len(shipment_ids) - listed:,} more" if len(shipment_ids) > listed else ""
+    return (f"{alert['description']} It is projected to close {' and '.join(roads)} for the next "
+            f"{alert.get('duration_hours', 48)} hours. {len(shipment_ids):,} shipments have these closures ahead "
+            f"on their current route ({shown}{more}). Propose rerouting strategies that apply to the whole group.")
+
+def alert_situations(alert: dict, index: CorridorIndex) -> tuple[dict, dict]:
+    """
+    Fans one alert out to its corridor groups. Returns (situations, members): situations
+    maps a corridor key to its situation text (ready for logistics.analyze_situations)
+    and members maps the same key to its shipment IDs.
+    """
+    groups = index.corridor_groups(alert["area"])
+    situations = {" + ".join(roads): corridor_situation(alert, roads, shipments) for roads, shipments in groups.items()}
+    members = {" + ".join(roads): shipments for roads, shipments in groups.items()}
+    return situations, members
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    import random
+
+    # A sketch of the interstate network: waypoints (lat, lon) along each road.
+    roads = {
+        "I-80": [(37.8, -122.3), (39.5, -119.8), (40.8, -111.9), (41.1, -104.8), (41.1, -100.8), (41.3, -96.0),
+                 (41.6, -93.6), (41.6, -87.6), (41.1, -81.5), (41.0, -77.6), (40.9, -74.2)],
+        "I-70": [(39.7, -105.0), (39.3, -101.7), (38.8, -97.6), (39.0, -95.7), (39.1, -94.6), (38.6, -90.2),
+                 (39.8, -86.2), (39.9, -83.0), (40.0, -80.7), (39.6, -77.7)],
+        "I-40": [(34.9, -117.0), (35.2, -111.7), (35.1, -106.6), (35.2, -101.8), (35.5, -97.5), (35.4, -94.4),
+                 (35.1, -90.0), (36.2, -86.8), (35.6, -83.9), (35.8, -78.6)],
+        "I-35": [(29.4, -98.5), (30.3, -97.7), (32.8, -97.3), (35.5, -97.5), (37.7, -97.3), (39.1, -94.6),
+                 (41.6, -93.6), (44.9, -93.3)],
+    }
+    index = CorridorIndex()
+    for road, points in roads.items():
+        for i in range(len(points) - 1):
+            index.add_segment(f"{road}:{i}", road, [points[i], points[i + 1]])
+
+    rng = random.Random(7)
+    for n in range(100_000):
+        road = rng.choice(list(roads))
+        start = rng.randrange(len(roads[road]) - 2)
+        end = rng.randrange(start + 1, len(roads[road]))
+        index.track(f"#{n:06d}", [f"{road}:{i}" for i in range(start, end)])
+
+    # Shipments keep moving: advancing 10k of them is incremental, not a rebuild.
+    started = time.perf_counter()
+    for n in range(0, 100_000, 10):
+        if len(index.routes[f"#{n:06d}"]) > 1:
+            index.advance(f"#{n:06d}")
+    print(f"Advanced 10,000 shipments in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    alert = {"id": "NWS-KS-0426", "area": (37.0, -102.0, 41.3, -94.0), "duration_hours": 48,
+             "description": "A severe weather alert has been issued for a storm system over Kansas and Nebraska."}
+    started = time.perf_counter()
+    segments = index.segments_in(alert["area"])
+    lookup_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    situations, members = alert_situations(alert, index)
+    fan_out_ms = (time.perf_counter() - started) * 1000
+
+    affected = sum(len(shipments) for shipments in members.values())
+    print(f"Segment lookup: {len(segments)} segments in {lookup_ms:.3f} ms")
+    print(f"Fan-out: {affected:,} of 100,000 shipments in {len(situations)} corridor groups in {fan_out_ms:.1f} ms")
+    for corridor, shipments in sorted(members.items(), key=lambda item: -len(item[1])):
+        print(f"  {corridor}: {len(shipments):,} shipments -> one analysis")
+    print(f"\n{next(iter(situations.values()))}")
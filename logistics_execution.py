@@ -0,0 +1,283 @@
+import hashlib
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+# shipments holds each shipment's current plan and ETA shift; execution_steps has one
+# row per completed side effect, keyed by its idempotency key, so a retried plan
+# never repeats a step that already happened.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shipments (
+    shipment_id TEXT PRIMARY KEY,
+    plan TEXT NOT NULL,
+    eta_impact_hours REAL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS execution_steps (
+    idempotency_key TEXT PRIMARY KEY,
+    shipment_id TEXT NOT NULL,
+    step TEXT NOT NULL,
+    completed REAL NOT NULL
+);
+"""
+
+STEPS = ("dispatch", "notify", "update")
+
+def idempotency_key(plan: dict, step: str) -> str:
+    """
+    The same approved plan always yields the same key per step. Plans carrying a
+    `plan_id` (e.g. the approval decision ID) are keyed by it; otherwise by shipment
+    and plan name, which suits retries within one batch run but makes a later
+    approval of the same plan for the same shipment look like a duplicate.
+    """
+    identity = plan.get("plan_id") or f"{plan['shipment_id']}|{plan['plan']}"
+    return hashlib.sha256(f"{identity}|{step}".encode()).hexdigest()[:32]
+
+class ExecutionStore:
+    """
+    The execution database behind a small connection pool. SQLite locally; anything
+    offering the same three methods (completed_keys, record, shipment) can stand in
+    for another database.
+    """
+
+    def __init__(self, path: str = "logistics_execution.sqlite3", pool_size: int = 4, busy_timeout: float = 10.0):
+        self.path = path
+        self._pool = queue.Queue()
+        for _ in range(pool_size):
+            db = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._pool.put(db)
+        with self.connection() as db:
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def connection(self):
+        db = self._pool.get()
+        try:
+            yield db
+        finally:
+            self._pool.put(db)
+
+    def completed_keys(self, keys: list[str]) -> set[str]:
+        """Which of `keys` have already been executed, in one query per 500 keys."""
+        done = set()
+        with self.connection() as db:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                done.update(row[0] for row in db.execute(
+                    f"SELECT idempotency_key FROM execution_steps WHERE idempotency_key IN ({','.join('?' * len(chunk))})",
+                    chunk))
+        return done
+
+    def record(self, plans: list[dict], steps: list[tuple]):
+        """
+        Writes every shipment update and completed step of a batch in one transaction.
+        `steps` holds (idempotency_key, shipment_id, step) tuples.
+        """
+        now = time.time()
+        with self.connection() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany(
+                    "INSERT INTO shipments (shipment_id, plan, eta_impact_hours, updated) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (shipment_id) DO UPDATE SET plan = excluded.plan, "
+                    "eta_impact_hours = excluded.eta_impact_hours, updated = excluded.updated",
+                    [(plan["shipment_id"], plan["plan"], plan.get("eta_impact_hours"), now) for plan in plans])
+                db.executemany("INSERT OR IGNORE INTO execution_steps VALUES (?, ?, ?, ?)",
+                               [step + (now,) for step in steps])
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def shipment(self, shipment_id: str) -> dict | None:
+        with self.connection() as db:
+            row = db.execute("SELECT plan, eta_impact_hours, updated FROM shipments WHERE shipment_id = ?",
+                             (shipment_id,)).fetchone()
+        return dict(zip(("plan", "eta_impact_hours", "updated"), row)) if row else None
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get().close()
+
+def dispatch_to_driver(plan: dict, key: str):
+    print(f"  -> Rerouting instructions for {plan['shipment_id']} dispatched to driver: '{plan['plan']}'.")
+
+def notify_customer(plan: dict, key: str):
+    print(f"  -> Customer of {plan['shipment_id']} notified of potential delay.")
+
+class PlanExecutor:
+    """
+    Executes approved plans in batches. For each batch:
+
+    1. one query finds which steps already completed (on an earlier try),
+    2. the remaining dispatch and notify calls run concurrently, each given its
+       idempotency key so the downstream service can also deduplicate,
+    3. one transaction writes every ETA update and every completed step.
+
+    A step's completion is recorded only after it succeeded, so a retry after a
+    failure repeats just the missing steps.
+    """
+
+    def __init__(self, store: ExecutionStore, dispatch=dispatch_to_driver, notify=notify_customer,
+                 concurrency: int = 32):
+        self.store = store
+        self.steps = {"dispatch": dispatch, "notify": notify}
+        self._pool = ThreadPoolExecutor(max_workers=concurrency)
+
+    def execute(self, plans: list[dict]) -> dict:
+        """
+        `plans` are dicts with shipment_id, plan (the approved option's name) and
+        optionally eta_impact_hours and plan_id. Returns counts of what was done, and
+        in "failed_indices" the positions in `plans` whose steps did not all complete.
+        Plans with the same identity (plan_id, or shipment and plan) run once. Raises
+        ValueError, before any side effect, if a plan has no shipment_id.
+        """
+        missing = [i for i, plan in enumerate(plans) if not plan.get("shipment_id")]
+        if missing:
+            raise ValueError(f"plans at positions {missing} have no shipment_id")
+        first = {}
+        for i, plan in enumerate(plans):
+            first.setdefault(idempotency_key(plan, ""), i)
+        originals, plans = plans, [plans[i] for i in first.values()]
+
+        keys = {(i, step): idempotency_key(plan, step) for i, plan in enumerate(plans) for step in STEPS}
+        done = self.store.completed_keys(list(keys.values()))
+
+        calls = {self._pool.submit(self.steps[step], plans[i], key): (i, step, key)
+                 for (i, step), key in keys.items() if step != "update" and key not in done}
+        completed_steps, failed = [], set()
+        for future, (i, step, key) in calls.items():
+            try:
+                future.result()
+                completed_steps.append((key, plans[i]["shipment_id"], step))
+            except Exception as e:
+                failed.add(i)
+                print(f"  -> ERROR: {step} for {plans[i]['shipment_id']} failed: {e}")
+
+        updates = [plan for i, plan in enumerate(plans) if i not in failed and keys[(i, "update")] not in done]
+        completed_steps += [(keys[(i, "update")], plan["shipment_id"], "update")
+                            for i, plan in enumerate(plans) if i not in failed and keys[(i, "update")] not in done]
+        self.store.record(updates, completed_steps)
+        failed_identities = {idempotency_key(plans[i], "") for i in failed}
+        return {
+            "plans": len(plans),
+            "duplicates": len(originals) - len(plans),
+            "steps_run": len(completed_steps),
+            "steps_skipped": len(done),
+            "failed_plans": len(failed),
+            "failed_indices": [i for i, plan in enumerate(originals) if idempotency_key(plan, "") in failed_identities],
+        }
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+class PlanBatcher:
+    """
+    Collects plans approved one at a time (e.g. ApprovalService's on_approved) and
+    executes them in batches of up to `max_batch`, at most `max_delay` seconds after
+    the first plan of a batch arrived.
+
+    on_approved blocks until the plan's batch has committed, so ApprovalService only
+    marks a decision executed once it really is. Batches are therefore at most as
+    large as the service's number of workers.
+    """
+
+    def __init__(self, executor: PlanExecutor, max_batch: int = 200, max_delay: float = 0.25):
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, plan: dict) -> Future:
+        """
+        Queues a plan. The returned Future resolves to the batch's result once it has
+        committed, or raises if the plan (or its whole batch) failed.
+        """
+        if not plan.get("shipment_id"):
+            raise ValueError("a plan needs a shipment_id")
+        future = Future()
+        self._queue.put((plan, future))
+        return future
+
+    def on_approved(self, decision: dict):
+        """
+        An ApprovalService callback: executes the approved option of a decision. Raises
+        ValueError for a decision without a shipment_id, which the service records as
+        its execution error.
+        """
+        if not decision.get("shipment_id"):
+            raise ValueError(f"decision {decision['id']} has no shipment_id to execute against")
+        chosen = next((option for option in decision["proposals"].get("options", [])
+                       if option.get("name") == decision["choice"]), {})
+        self.add({"shipment_id": decision["shipment_id"],
+                  "plan": decision["choice"], "eta_impact_hours": chosen.get("eta_impact_hours"),
+                  "plan_id": f"decision-{decision['id']}"}).result()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch, deadline = [item], time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            try:
+                result = self.executor.execute([plan for plan, _ in batch])
+            except Exception as e:
+                print(f"  -> ERROR: executing a batch of {len(batch)} plans failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            failed = set(result["failed_indices"])
+            for i, (plan, future) in enumerate(batch):
+                if i in failed:
+                    future.set_exception(RuntimeError(f"plan for {plan['shipment_id']} did not complete"))
+                else:
+                    future.set_result(result)
+
+    def close(self):
+        """Executes everything still queued, then stops."""
+        self._queue.put(None)
+        self._thread.join()
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    calls = {"dispatch": 0, "notify": 0}
+    lock = threading.Lock()
+
+    def simulated(step):
+        def call(plan, key):
+            time.sleep(0.05)  # a network round-trip to the dispatch / notification service
+            with lock:
+                calls[step] += 1
+        return call
+
+    store = ExecutionStore(os.path.join(tempfile.mkdtemp(), "execution.sqlite3"))
+    executor = PlanExecutor(store, dispatch=simulated("dispatch"), notify=simulated("notify"), concurrency=64)
+    plans = [{"shipment_id": f"#{i:03d}-A", "plan": "Southern Reroute via I-40", "eta_impact_hours": 10}
+             for i in range(300)]
+
+    started = time.perf_counter()
+    print(f"First run:  {executor.execute(plans)} in {time.perf_counter() - started:.2f}s")
+    started = time.perf_counter()
+    print(f"Retry:      {executor.execute(plans)} in {time.perf_counter() - started:.2f}s")
+    print(f"Side effects: {calls} (one per shipment and step despite the retry)")
+    print(f"#042-A: {store.shipment('#042-A')}")
+    executor.close()
+    store.close()
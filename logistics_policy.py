@@ -0,0 +1,236 @@
+import json
+import math
+import re
+import threading
+import time
+
+# The default auto-approval policy. For each option, rules are tried in order and the
+# first one whose conditions all hold decides: "approve" or "escalate". An option no
+# rule matches is escalated. A proposal is auto-approved if any option is approved;
+# among those, the one with the lowest `prefer` field is chosen. Unknown values are
+# treated as the worst case: without a priority, a shipment may be critical.
+DEFAULT_POLICY = {
+    "version": "2026-10-1",
+    "prefer": "eta_impact_hours",
+    "rules": [
+        {"name": "critical-shipments-need-a-person", "action": "escalate",
+         "when": {"priority": {"in": ["critical"]}}},
+        {"name": "high-risk-needs-a-person", "action": "escalate",
+         "when": {"risk": {"not in": ["low", "medium"]}}},
+        {"name": "minor-reroute", "action": "approve",
+         "when": {"cost_impact": {"<=": 500}, "eta_impact_hours": {"<=": 2}, "risk": {"in": ["low"]}}},
+        {"name": "cheap-delay-low-priority", "action": "approve",
+         "when": {"priority": {"in": ["low"]}, "cost_impact": {"<=": 1500}, "eta_impact_hours": {"<=": 24}}},
+    ],
+}
+
+# field -> kind. Numbers are compared as numbers; text is compared lower-cased.
+# risk is reduced to its level (low, medium or high), since the model writes it as a
+# sentence, e.g. "Low - I-40 is clear".
+POLICY_FIELDS = {
+    "cost_impact": "number",
+    "eta_impact_hours": "number",
+    "risk": "text",
+    "priority": "text",
+}
+_OPERATORS = {"<": "<", "<=": "<=", ">": ">", ">=": ">=", "==": "==", "!=": "!=", "in": "in", "not in": "not in"}
+_RISK_LEVEL = re.compile(r"\b(low|medium|high)\b")
+_NEGATION = re.compile(r"\b(not|no|non|never|isn't|aren't)\W+(?:\w+\W+)?$")
+
+def risk_level(risk) -> str | None:
+    """
+    The one level the risk text names as a whole word. None when it names none, more
+    than one ("low to medium"), or negates one ("Not low: ..."), so an unclear
+    assessment counts as missing.
+    """
+    text = str(risk or "").lower()
+    matches = list(_RISK_LEVEL.finditer(text))
+    if len({match.group() for match in matches}) != 1:
+        return None
+    if any(_NEGATION.search(text[:match.start()]) for match in matches):
+        return None
+    return matches[0].group()
+
+def _number(value):
+    """A finite int or float, or None; NaN and infinities are unknown, like any non-number."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return value
+    return None
+
+def _literal(kind: str, operator: str, value):
+    """The Python source of a rule's value, after checking it fits the field."""
+    if operator in ("in", "not in"):
+        if not isinstance(value, list) or not value:
+            raise ValueError(f"'{operator}' needs a non-empty list, got {value!r}")
+        return "{" + ", ".join(_literal(kind, "==", item) for item in value) + "}"
+    if kind == "number":
+        if _number(value) is None:
+            raise ValueError(f"expected a finite number, got {value!r}")
+        return repr(value)
+    if not isinstance(value, str):
+        raise ValueError(f"expected text, got {value!r}")
+    return repr(value.lower())
+
+def compile_policy(policy: dict):
+    """
+    Generates one straight-line function for the whole rule list, so evaluating an
+    option is a few comparisons rather than a walk over the rule data. Raises
+    ValueError for unknown fields, operators or actions, and for ill-typed values.
+    """
+    lines = ["def evaluate(cost_impact, eta_impact_hours, risk, priority):"]
+    for n, rule in enumerate(policy["rules"]):
+        name = rule.get("name") or f"rule-{n + 1}"
+        if rule.get("action") not in ("approve", "escalate"):
+            raise ValueError(f"{name}: action must be 'approve' or 'escalate'")
+        conditions = []
+        for field, tests in rule.get("when", {}).items():
+            if field not in POLICY_FIELDS:
+                raise ValueError(f"{name}: unknown field {field!r}")
+            for operator, value in tests.items():
+                if operator not in _OPERATORS:
+                    raise ValueError(f"{name}: unknown operator {operator!r}")
+                try:
+                    literal = _literal(POLICY_FIELDS[field], operator, value)
+                except ValueError as e:
+                    raise ValueError(f"{name}: {field}: {e}") from None
+                # A missing value fails every condition of an approve rule and meets
+                # every condition of an escalate rule, so it can only cause escalation.
+                if rule["action"] == "approve":
+                    conditions.append(f"({field} is not None and {field} {_OPERATORS[operator]} {literal})")
+                else:
+                    conditions.append(f"({field} is None or {field} {_OPERATORS[operator]} {literal})")
+        lines.append(f"    if {' and '.join(conditions) or 'True'}:")
+        lines.append(f"        return {rule['action']!r}, {name!r}")
+    lines.append("    return 'escalate', None")
+    namespace = {}
+    exec("\n".join(lines), namespace)
+    return namespace["evaluate"]
+
+class AuditLog:
+    """Appends one JSON line per policy decision; safe to share between threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, entry: dict):
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class PolicyEngine:
+    """
+    Auto-approves proposals the policy allows, so a person only sees the rest.
+    The policy is compiled once; decide() then costs a few microseconds per option
+    plus the audit line. Fields that are missing, non-numeric, non-finite or (for
+    risk) unclear count as unknown, and an unknown field never helps an option get
+    approved.
+    """
+
+    def __init__(self, policy: dict = DEFAULT_POLICY, audit: AuditLog | None = None):
+        self.policy = policy
+        self.version = policy.get("version")
+        self.prefer = policy.get("prefer", "eta_impact_hours")
+        self._evaluate = compile_policy(policy)
+        self.audit = audit
+
+    def _preference(self, item: tuple) -> float:
+        value = _number(item[0].get(self.prefer))
+        return float("inf") if value is None else value
+
+    @classmethod
+    def load(cls, path: str, audit: AuditLog | None = None) -> "PolicyEngine":
+        with open(path) as f:
+            return cls(json.load(f), audit)
+
+    def decide(self, proposals: dict, priority: str | None = None, shipment_id: str | None = None) -> dict:
+        """
+        Returns {"action": "approve" | "escalate", "choice": option name or None,
+        "rule": the deciding rule, "options": [(name, action, rule), ...]}.
+        """
+        priority = priority.lower() if priority else None
+        evaluate = self._evaluate
+        verdicts, approved = [], []
+        for option in proposals.get("options", []):
+            action, rule = evaluate(_number(option.get("cost_impact")), _number(option.get("eta_impact_hours")),
+                                    risk_level(option.get("risk")), priority)
+            verdicts.append((option.get("name"), action, rule))
+            if action == "approve":
+                approved.append((option, rule))
+        if approved:
+            option, rule = min(approved, key=self._preference)
+            verdict = {"action": "approve", "choice": option.get("name"), "rule": rule, "options": verdicts}
+        else:
+            verdict = {"action": "escalate", "choice": None, "rule": None, "options": verdicts}
+        if self.audit is not None:
+            self.audit.write(dict(verdict, time=time.time(), shipment_id=shipment_id, priority=priority,
+                                  policy_version=self.version))
+        return verdict
+
+def approve_or_escalate(engine: PolicyEngine, proposals: dict, hitl, priority: str | None = None,
+                        shipment_id: str | None = None) -> str | None:
+    """
+    The policy's choice if it approves one, otherwise the human's decision from
+    `hitl` (e.g. HumanInTheLoop().get_human_validation).
+    """
+    verdict = engine.decide(proposals, priority, shipment_id)
+    if verdict["action"] == "approve":
+        print(f"\n🤖 Auto-approved '{verdict['choice']}' under policy rule '{verdict['rule']}'.")
+        return verdict["choice"]
+    return hitl(proposals)
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    import os
+    import random
+    import tempfile
+
+    audit_path = os.path.join(tempfile.mkdtemp(), "policy_audit.jsonl")
+    engine = PolicyEngine(DEFAULT_POLICY, AuditLog(audit_path))
+
+    rng = random.Random(3)
+    priorities = ["low", "standard", "standard", "standard", "critical"]
+    shipments = []
+    for i in range(20_000):
+        shipments.append((f"#{i:05d}-A", rng.choice(priorities), {"options": [
+            {"name": "Local detour", "strategy": "Take the county roads around the closure.",
+             "cost_impact": rng.randrange(100, 900), "eta_impact_hours": rng.choice([0.5, 1, 2, 3]),
+             "risk": rng.choice(["Low", "Low - roads are clear", "Medium: narrow roads"])},
+            {"name": "Southern Reroute via I-40", "strategy": "Divert south to I-40.",
+             "cost_impact": rng.randrange(800, 2500), "eta_impact_hours": rng.randrange(6, 14),
+             "risk": "Low"},
+            {"name": "Hold in Kansas City", "strategy": "Wait out the closures.", "cost_impact": 950,
+             "eta_impact_hours": 48, "risk": rng.choice(["Medium", "High: the storm may stall"])},
+        ]}))
+
+    unaudited = PolicyEngine(DEFAULT_POLICY)
+    started = time.perf_counter()
+    for shipment_id, priority, proposals in shipments:
+        unaudited.decide(proposals, priority, shipment_id)
+    evaluation = time.perf_counter() - started
+
+    started = time.perf_counter()
+    verdicts = [engine.decide(proposals, priority, shipment_id) for shipment_id, priority, proposals in shipments]
+    elapsed = time.perf_counter() - started
+    engine.audit.close()
+
+    approved = sum(verdict["action"] == "approve" for verdict in verdicts)
+    print(f"Decided {len(verdicts):,} three-option proposals: {evaluation / len(verdicts) * 1e6:.1f} µs each, "
+          f"{elapsed / len(verdicts) * 1e6:.1f} µs with the audit line")
+    print(f"Auto-approved {approved:,}; escalated {len(verdicts) - approved:,} to a person")
+    by_rule = {}
+    for verdict in verdicts:
+        by_rule[verdict["rule"]] = by_rule.get(verdict["rule"], 0) + 1
+    print(f"By deciding rule: {by_rule}")
+    with open(audit_path) as f:
+        print(f"\nAudit: {f.readline().strip()}")
+
+    try:
+        PolicyEngine({"rules": [{"name": "typo", "action": "approve", "when": {"cost": {"<=": 500}}}]})
+    except ValueError as e:
+        print(f"\nRejected at compile time: {e}")
@@ -0,0 +1,262 @@
+import json
+import re
+
+# The fields of one proposed option: (key, type, required, default).
+# Required fields that are missing or unusable are re-requested from the model;
+# optional ones fall back to their default locally.
+OPTION_FIELDS = (
+    ("name", "string", True, None),
+    ("strategy", "string", False, "No strategy given."),
+    ("cost_impact", "number", True, None),
+    ("eta_impact_hours", "number", True, None),
+    ("risk", "string", False, "Not assessed."),
+)
+
+# A plain numeral, optionally with a leading $, thousands separators or an hours
+# suffix. Anything else ("$25K", "1.5 days", "about 10") has a scale or unit we
+# can't safely guess, so it is re-requested instead of coerced.
+_NUMBER = re.compile(r"([-+]?)\$?([-+]?)((?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?|\.\d+)\s*(?:h|hours?)?",
+                     re.IGNORECASE)
+
+def _to_number(value):
+    """
+    Coerces numbers written as text ("$1,800", "10 hours", "12.5") to a number.
+    Returns None when the text is not just a number, so the field is re-requested.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        match = _NUMBER.fullmatch(value.strip())
+        if match and not (match.group(1) and match.group(2)):
+            sign = "-" if "-" in (match.group(1) + match.group(2)) else ""
+            number = float(sign + match.group(3).replace(",", ""))
+            return int(number) if number.is_integer() else number
+    return None
+
+class FieldError:
+    """One problem with the payload, addressed by its path, e.g. options[1].cost_impact."""
+
+    __slots__ = ("path", "problem")
+
+    def __init__(self, path: str, problem: str):
+        self.path = path
+        self.problem = problem
+
+    def __repr__(self):
+        return f"{self.path}: {self.problem}"
+
+def close_truncated_json(text: str) -> str | None:
+    """
+    Cuts a truncated JSON document back to its last complete value and closes every
+    container still open, e.g. '{"options": [{"name": "A", "cost' -> '{"options": [{"name": "A"}]}'.
+    Returns None if not even the outermost container was opened.
+    """
+    stack = []
+    safe_end, safe_stack = None, []
+    in_string = escaped = is_key = False
+    previous = None
+    for i, c in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+                previous = '"'
+                if not is_key:
+                    safe_end, safe_stack = i + 1, stack[:]
+            continue
+        if c.isspace():
+            continue
+        if c == '"':
+            in_string = True
+            is_key = bool(stack) and stack[-1] == "{" and previous in ("{", ",")
+        elif c in "{[":
+            stack.append(c)
+            safe_end, safe_stack = i + 1, stack[:]
+        elif c in "}]":
+            if stack:
+                stack.pop()
+            safe_end, safe_stack = i + 1, stack[:]
+        elif c == "," and previous not in ('"', "}", "]", ",", "{", "["):
+            # A number or literal just ended; it's only known to be complete here.
+            safe_end, safe_stack = i, stack[:]
+        previous = c
+    if safe_end is None:
+        return None
+    return text[:safe_end] + "".join("}" if bracket == "{" else "]" for bracket in reversed(safe_stack))
+
+def _compile_option_check(fields):
+    """
+    Generates one straight-line function that validates, coerces and defaults a single
+    option, so the per-option cost is a handful of dict lookups and isinstance calls.
+    """
+    lines = ["def check_option(option, path, errors, repairs, missing):",
+             "    checked = {}"]
+    for key, kind, required, default in fields:
+        lines.append(f"    value = option.get({key!r})")
+        if kind == "number":
+            lines += [
+                "    if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):",
+                "        number = _to_number(value)",
+                "        if number is None:",
+                f"            errors.append(FieldError(path + {'.' + key!r}, 'expected a number, got ' + repr(value)))",
+                "        else:",
+                f"            repairs.append(FieldError(path + {'.' + key!r}, 'coerced ' + repr(value) + ' to ' + repr(number)))",
+                "        value = number",
+            ]
+        else:
+            lines += [
+                "    if value is not None and not isinstance(value, str):",
+                f"        repairs.append(FieldError(path + {'.' + key!r}, 'coerced ' + type(value).__name__ + ' to text'))",
+                "        value = json.dumps(value) if isinstance(value, (dict, list)) else str(value)",
+                "    if value is not None and not value.strip():",
+                "        value = None",
+            ]
+        lines.append("    if value is None:")
+        if required:
+            lines += [f"        errors.append(FieldError(path + {'.' + key!r}, 'missing'))",
+                      f"        missing.append({key!r})"]
+        else:
+            lines += [f"        repairs.append(FieldError(path + {'.' + key!r}, 'defaulted'))",
+                      f"        value = {default!r}"]
+        lines.append(f"    checked[{key!r}] = value")
+    lines.append("    return checked")
+    namespace = {"_to_number": _to_number, "FieldError": FieldError, "json": json}
+    exec("\n".join(lines), namespace)
+    return namespace["check_option"]
+
+class ProposalValidator:
+    """
+    Validates the analyst's {"options": [...]} payload against OPTION_FIELDS.
+
+    Cheap problems are repaired locally: truncated JSON is closed, numbers written as
+    text are coerced, optional fields get defaults. What can't be repaired (missing
+    required fields, missing options) is reported precisely, and follow_up_messages()
+    asks the model for just those pieces instead of a whole new response.
+    """
+
+    def __init__(self, fields=OPTION_FIELDS, expected_options: int = 3):
+        self.fields = fields
+        self.expected_options = expected_options
+        self._check_option = _compile_option_check(fields)
+
+    def parse(self, text: str, repairs: list) -> dict | None:
+        try:
+            return json.loads(text)
+        except (TypeError, ValueError):
+            pass
+        closed = close_truncated_json(text or "")
+        if closed is not None:
+            try:
+                payload = json.loads(closed)
+                repairs.append(FieldError("$", "closed truncated JSON"))
+                return payload
+            except ValueError:
+                pass
+        return None
+
+    def check(self, payload) -> tuple[dict, dict]:
+        """
+        Validates a payload (a dict, or the raw response text). Returns the usable
+        proposals and a report with "errors", "repairs", "missing" (option index ->
+        required fields still needed) and "missing_options" (how many more are needed).
+        Options that still lack required fields are held back from the proposals.
+        """
+        repairs, errors = [], []
+        if isinstance(payload, (str, bytes)):
+            payload = self.parse(payload, repairs)
+        options = payload.get("options") if isinstance(payload, dict) else None
+        if not isinstance(options, list):
+            errors.append(FieldError("$.options", "missing or not a list"))
+            options = []
+
+        checked, missing = [], {}
+        for i, option in enumerate(options):
+            path = f"options[{i}]"
+            if not isinstance(option, dict) or not option:
+                errors.append(FieldError(path, "not an object" if option else "empty"))
+                missing[i] = [key for key, _, required, _ in self.fields if required]
+                checked.append({})
+                continue
+            needed = []
+            checked.append(self._check_option(option, path, errors, repairs, needed))
+            if needed:
+                missing[i] = needed
+
+        report = {
+            "errors": errors,
+            "repairs": repairs,
+            "missing": missing,
+            "missing_options": max(0, self.expected_options - len(checked)),
+            "partial": checked,
+        }
+        return {"options": [option for i, option in enumerate(checked) if i not in missing]}, report
+
+    def follow_up_messages(self, system_prompt: str, situation: str, report: dict) -> list[dict]:
+        """
+        A short request for only what the report says is missing.
+        """
+        asks = []
+        for i, keys in report["missing"].items():
+            known = {key: value for key, value in report["partial"][i].items() if value is not None}
+            asks.append(f"- option {i}: known so far {json.dumps(known)}; provide only {', '.join(keys)}")
+        if report["missing_options"]:
+            asks.append(f"- {report['missing_options']} additional distinct option(s), with every field")
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": situation},
+            {"role": "user", "content": (
+                "Your previous answer was incomplete. Reply with a JSON object {\"patches\": [...], \"new_options\": [...]} "
+                "where each patch is {\"index\": <option index>, <field>: <value>, ...}. Write numbers as plain numerals "
+                "(cost_impact in US dollars, eta_impact_hours in hours). Provide only:\n" + "\n".join(asks))},
+        ]
+
+    def merge(self, report: dict, follow_up) -> tuple[dict, dict]:
+        """
+        Applies the follow-up answer to the partial options and re-validates.
+        """
+        options = [dict(option) for option in report["partial"]]
+        if isinstance(follow_up, (str, bytes)):
+            follow_up = self.parse(follow_up, [])
+        if isinstance(follow_up, dict):
+            for patch in follow_up.get("patches") or []:
+                if isinstance(patch, dict) and isinstance(patch.get("index"), int) and 0 <= patch["index"] < len(options):
+                    index = patch["index"]
+                    options[index].update({key: value for key, value in patch.items()
+                                           if key != "index" and options[index].get(key) is None})
+            options += [option for option in follow_up.get("new_options") or [] if isinstance(option, dict)]
+        proposals, merged = self.check({"options": options})
+        merged["repairs"] = report["repairs"] + merged["repairs"]
+        return proposals, merged
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    import time
+
+    validator = ProposalValidator()
+    # A response cut off mid-option, with a cost written as text and a missing risk.
+    truncated = ('{"options": [{"name": "Southern Reroute via I-40", "strategy": "Divert south.", '
+                 '"cost_impact": "$1,800", "eta_impact_hours": 10}, {"name": "Hold in Kansas City", '
+                 '"strategy": "Wait it out.", "cost_impact": 950, "eta_impact_hours": 48, "risk": "Medium"}, '
+                 '{"name": "Transload to Rail", "strategy": "Move to an intermodal tr')
+    proposals, report = validator.check(truncated)
+    print(f"Usable options: {[option['name'] for option in proposals['options']]}")
+    print(f"Repairs: {report['repairs']}")
+    print(f"Errors: {report['errors']}")
+    print(f"Still missing: {report['missing']}")
+
+    print("\n--- Follow-up request ---")
+    print(validator.follow_up_messages("(system prompt)", "(situation)", report)[-1]["content"])
+    proposals, report = validator.merge(report, '{"patches": [{"index": 2, "cost_impact": 4200, '
+                                                '"eta_impact_hours": 18}], "new_options": []}')
+    print(f"\nAfter merging: {[option['name'] for option in proposals['options']]}, errors: {report['errors']}")
+
+    valid = json.dumps({"options": proposals["options"]})
+    started = time.perf_counter()
+    for _ in range(10_000):
+        validator.check(valid)
+    print(f"\nparse + validate a valid payload: {(time.perf_counter() - started) * 100:.1f} µs")
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlparse
+
+import pytest
+
+from llm_resilience import CircuitBreaker, CircuitOpenError, ResilientCaller, is_retryable
+from llm_standin import start_standin_server
+
+class UpstreamError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+async def chat(base_url: str) -> dict:
+    """
+    One chat completion over a raw asyncio connection, so a cancelled attempt really
+    hangs up (and the tests don't need an HTTP client library).
+    """
+    url = urlparse(base_url)
+    body = json.dumps({"model": "standin", "messages": [{"role": "user", "content": "ping"}]}).encode()
+    reader, writer = await asyncio.open_connection(url.hostname, url.port)
+    try:
+        writer.write(f"POST {url.path}/chat/completions HTTP/1.1\r\nHost: {url.netloc}\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                     "Connection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        payload = await reader.readexactly(length)
+    finally:
+        writer.close()
+    if status != 200:
+        raise UpstreamError(status)
+    return json.loads(payload)
+
+@pytest.fixture
+def standin():
+    server, base_url = start_standin_server(delay=0.01, slow_delay=1.0)
+    yield server, base_url
+    server.shutdown()
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_retries_through_5xx_with_backoff(standin):
+    server, base_url = standin
+    server.faults.extend(["fail", "fail"])
+    caller = ResilientCaller(backoff_base=0.05, seed=1)
+    started = time.monotonic()
+    answer = run(caller.call(lambda: chat(base_url)))
+    assert answer["choices"][0]["message"]["content"]
+    assert caller.stats["attempts"] == 3 and caller.stats["retries"] == 2
+    # Full jitter: never longer than the capped exponential backoff.
+    assert time.monotonic() - started < 0.05 + 0.1 + 1.0
+
+def test_retries_429(standin):
+    server, base_url = standin
+    server.fail_status = 429
+    server.faults.append("fail")
+    caller = ResilientCaller(backoff_base=0.01, seed=1)
+    run(caller.call(lambda: chat(base_url)))
+    assert caller.stats["retries"] == 1
+
+def test_gives_up_after_max_attempts(standin):
+    server, base_url = standin
+    server.fail_rate = 1.0
+    caller = ResilientCaller(max_attempts=3, backoff_base=0.01, seed=1)
+    with pytest.raises(UpstreamError):
+        run(caller.call(lambda: chat(base_url)))
+    assert caller.stats["attempts"] == 3 and caller.stats["failures"] == 1
+
+def test_timeout_is_retried(standin):
+    server, base_url = standin
+    server.faults.append("slow")
+    caller = ResilientCaller(attempt_timeout=0.3, backoff_base=0.01, seed=1)
+    started = time.monotonic()
+    run(caller.call(lambda: chat(base_url)))
+    assert caller.stats["timeouts"] == 1 and caller.stats["retries"] == 1
+    assert time.monotonic() - started < 0.9
+
+def test_non_retryable_4xx_is_not_retried_or_counted(standin):
+    server, base_url = standin
+    server.fail_status = 400
+    server.fail_rate = 1.0
+    breaker = CircuitBreaker(min_calls=2, window=4)
+    caller = ResilientCaller(backoff_base=0.01, breaker=breaker, seed=1)
+    for _ in range(5):
+        with pytest.raises(UpstreamError):
+            run(caller.call(lambda: chat(base_url)))
+    assert caller.stats["attempts"] == 5
+    assert breaker.state == "closed"
+    assert not is_retryable(UpstreamError(400)) and is_retryable(UpstreamError(503))
+
+def test_breaker_opens_half_opens_and_closes(standin):
+    server, base_url = standin
+    server.fail_rate = 1.0
+    breaker = CircuitBreaker(failure_ratio=0.5, window=4, min_calls=4, reset_timeout=0.3)
+    caller = ResilientCaller(max_attempts=1, breaker=breaker, seed=1)
+
+    async def scenario():
+        for _ in range(4):
+            with pytest.raises(UpstreamError):
+                await caller.call(lambda: chat(base_url))
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            await caller.call(lambda: chat(base_url))
+
+        # Half-open: one trial goes through; its failure re-opens the breaker.
+        await asyncio.sleep(0.35)
+        assert breaker.state == "half_open"
+        with pytest.raises(UpstreamError):
+            await caller.call(lambda: chat(base_url))
+        assert breaker.state == "open"
+
+        # The next trial succeeds and closes it.
+        server.fail_rate = 0.0
+        await asyncio.sleep(0.35)
+        await caller.call(lambda: chat(base_url))
+        assert breaker.state == "closed"
+
+    run(scenario())
+    assert caller.stats["short_circuited"] == 1
+
+def test_cancelled_half_open_trial_frees_the_slot(standin):
+    server, base_url = standin
+    breaker = CircuitBreaker(window=2, min_calls=2, reset_timeout=0.1)
+    breaker.record_failure()
+    breaker.record_failure()
+    caller = ResilientCaller(breaker=breaker, seed=1)
+
+    async def scenario():
+        await asyncio.sleep(0.15)
+        server.faults.append("slow")
+        trial = asyncio.ensure_future(caller.call(lambda: chat(base_url)))
+        await asyncio.sleep(0.05)
+        assert breaker.trial_in_flight
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        assert not breaker.trial_in_flight
+        await caller.call(lambda: chat(base_url))
+        assert breaker.state == "closed"
+
+    run(scenario())
+
+def test_hedging_sidesteps_a_slow_tail(standin):
+    server, base_url = standin
+    caller = ResilientCaller(attempt_timeout=2.0, hedge=True, hedge_quantile=0.9, seed=1)
+
+    async def scenario():
+        for _ in range(20):
+            await caller.call(lambda: chat(base_url))
+        assert caller.hedge_delay() is not None
+        server.faults.append("slow")  # the primary stalls; the hedge doesn't
+        started = time.monotonic()
+        await caller.call(lambda: chat(base_url))
+        return time.monotonic() - started
+
+    elapsed = run(scenario())
+    assert caller.stats["hedges"] == 1 and caller.stats["hedge_wins"] == 1
+    assert caller.stats["retries"] == 0
+    assert elapsed < 0.5